@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from skills.state import read_json, write_json_atomic
+
+# --- Configuration ---
+SEEN_FILE = PROJECT_ROOT / "memory" / "mattermost_seen.json"
+DEDUP_SIZE = int(os.getenv("MATTERMOST_DEDUP_SIZE", 2000))  # Post ids remembered
+SAVE_INTERVAL = 2.0  # Seconds; changes are written at most this often (plus once at shutdown)
+
+
+class SeenPosts:
+    """
+    Bounded window of handled post ids in arrival order, persisted across
+    restarts. Once full, the id seen longest ago is evicted. Also tracks
+    the newest create_at seen (Mattermost ms timestamps): the point from
+    which missed posts are fetched after a reconnect.
+    """
+
+    def __init__(self, path=SEEN_FILE, size: int = DEDUP_SIZE):
+        self.path = Path(path)
+        self.size = max(1, size)
+        state = read_json(self.path, {})
+        self.posts = OrderedDict((post_id, create_at) for post_id, create_at in state.get("posts", []))
+        self.last_create_at = state.get("last_create_at")
+        self.dirty = False
+        self.saved_at = 0.0
+        self._trim()
+
+    def _trim(self):
+        while len(self.posts) > self.size:
+            self.posts.popitem(last=False)
+
+    def __contains__(self, post_id):
+        return post_id in self.posts
+
+    def add(self, post_id, create_at=None) -> bool:
+        """Remember a post; False if it was already seen."""
+        if post_id in self.posts:
+            return False
+        self.posts[post_id] = create_at
+        self._trim()
+        if create_at:
+            self.last_create_at = max(self.last_create_at or 0, create_at)
+        self.dirty = True
+        return True
+
+    def mark_now(self):
+        """Start the catch-up point at the current time if nothing was seen yet."""
+        if self.last_create_at is None:
+            self.last_create_at = int(time.time() * 1000)
+            self.dirty = True
+
+    def since(self, max_age: float):
+        """create_at (ms) to catch up from: the newest seen, but no older than max_age seconds."""
+        if self.last_create_at is None:
+            return None
+        return max(self.last_create_at, int((time.time() - max_age) * 1000))
+
+    def save(self, force: bool = False):
+        if not self.dirty or (not force and time.time() - self.saved_at < SAVE_INTERVAL):
+            return
+        write_json_atomic(self.path, {
+            "last_create_at": self.last_create_at,
+            "posts": list(self.posts.items()),
+        })
+        self.dirty = False
+        self.saved_at = time.time()
@@ -64,7 +64,7 @@ class MattermostBot:
         try:
             # 1. Memory Search
             hits = self.mem.search(user_query, limit=2)
-            context = "\n".join([f"- {h['content'][:200]}" for h in hits])
+            context = "\n".join([f"- {h['snippet']}" for h in hits])
 
             # 2. LLM Call
             prompt = f"""
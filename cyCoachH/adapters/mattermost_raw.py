@@ -2,13 +2,13 @@ import asyncio
 import json
 import os
 import sys
-import requests
+import time
 import websockets
 from datetime import datetime
 from pathlib import Path
 from rich.console import Console
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # --- Path Setup ---
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -16,9 +16,11 @@ sys.path.append(str(PROJECT_ROOT))
 
 try:
     from memory.ingest import MemorySystem
-    from skills.weather import get_current_weather
-    # REPLACED: runalyze -> endurain
-    from skills.endurain import calculate_metrics
+    # Weather, Endurain metrics and memory hits, gathered concurrently
+    from skills.registry import gather_context, coach_sources
+    from skills.async_http import get_session, close_session, HTTP_ERRORS
+    from adapters.pipeline import MessagePipeline
+    from adapters.dedup import SeenPosts, SAVE_INTERVAL
 except ImportError:
     print("Error: Could not import internal modules. Check folder structure.")
     sys.exit(1)
@@ -34,23 +36,40 @@ MM_TOKEN = os.getenv("MATTERMOST_TOKEN")
 BASE_API = f"http://{MM_URL}:{MM_PORT}/api/v4"
 WS_URL = f"ws://{MM_URL}:{MM_PORT}/api/v4/websocket"
 
+BUSY_REPLY = "Ich bin gerade ausgelastet. Bitte versuche es in ein paar Minuten nochmal."
+
+# --- Streaming ---
+# Replies start as a placeholder post that is patched while tokens arrive.
+PLACEHOLDER = "_cyCoachH denkt nach..._"
+STREAM_CURSOR = " ▍"
+STREAM_EDIT_INTERVAL = float(os.getenv("MATTERMOST_EDIT_INTERVAL", 1.0))  # Min. seconds between edits of one post
+
+# --- Catch-up ---
+# After every (re)connect, posts created since the newest one seen are fetched
+# page by page and go through the normal pipeline.
+CATCHUP_MAX_AGE = int(os.getenv("MATTERMOST_CATCHUP_MAX_AGE", 6 * 3600))  # Seconds; older posts stay unanswered
+CATCHUP_PAGE_SIZE = 100
+CATCHUP_MAX_PAGES = 10  # Per channel
+
 console = Console()
-client = OpenAI(api_key=API_KEY, base_url="https://api.deepseek.com")
+client = AsyncOpenAI(api_key=API_KEY, base_url="https://api.deepseek.com")
 
 class RobustGateway:
     def __init__(self):
         self.mem = MemorySystem()
         self.bot_user_id = None
-        self.session = requests.Session()
-        self.session.headers.update({"Authorization": f"Bearer {MM_TOKEN}"})
-        self.processed_posts = set()
+        self.headers = {"Authorization": f"Bearer {MM_TOKEN}"}
+        self.processed_posts = SeenPosts()  # Persisted, bounded, oldest evicted first
+        self.catchup_task = None
+        # Replies are built by pipeline workers, concurrently with the websocket loop
+        self.pipeline = MessagePipeline(self.handle_post)
 
-    def get_bot_id(self):
+    async def get_bot_id(self):
         """Get self ID via REST API."""
         try:
-            r = self.session.get(f"{BASE_API}/users/me")
-            r.raise_for_status()
-            user = r.json()
+            async with get_session().get(f"{BASE_API}/users/me", headers=self.headers) as r:
+                r.raise_for_status()
+                user = await r.json()
             self.bot_user_id = user['id']
             console.print(f"[green]Authenticated as: {user['username']} ({self.bot_user_id})[/green]")
             return True
@@ -58,29 +77,44 @@ class RobustGateway:
             console.print(f"[red]REST API Auth Failed: {e}[/red]")
             return False
 
-    def send_reply(self, channel_id, message, root_id=None):
-        """Send message via REST API."""
+    async def send_reply(self, channel_id, message, root_id=None):
+        """Send message via REST API. Returns the new post's id, or None."""
         payload = {
             "channel_id": channel_id,
             "message": message,
             "root_id": root_id or ""
         }
         try:
-            self.session.post(f"{BASE_API}/posts", json=payload)
+            async with get_session().post(f"{BASE_API}/posts", json=payload, headers=self.headers) as r:
+                r.raise_for_status()
+                created = await r.json()
             console.print(f"[blue]Replied to {channel_id}[/blue]")
-        except Exception as e:
+            return created.get('id')
+        except HTTP_ERRORS as e:
             console.print(f"[red]Failed to send reply: {e}[/red]")
+            return None
+
+    async def edit_reply(self, post_id, message):
+        """Replace the text of an existing post via REST API."""
+        try:
+            async with get_session().put(
+                f"{BASE_API}/posts/{post_id}/patch", json={"message": message}, headers=self.headers
+            ) as r:
+                r.raise_for_status()
+            return True
+        except HTTP_ERRORS as e:
+            console.print(f"[red]Failed to edit reply {post_id}: {e}[/red]")
+            return False
 
-    def think(self, user_query):
-        """Brain logic with Endurain integration."""
+    async def think(self, user_query):
+        """Brain logic with Endurain integration. Yields the answer as text deltas."""
         now_str = datetime.now().strftime("%A, %Y-%m-%d %H:%M")
-        weather_str = get_current_weather()
-        
-        # Calculate Training Status via Endurain
-        endurain_str = calculate_metrics()
-        
-        hits = self.mem.search(user_query, limit=2)
-        context = "\n".join([f"- {h['content'][:200]}" for h in hits])
+
+        # All sources at once, each with its own deadline and fallback
+        sources = await gather_context(coach_sources(self.mem, user_query, limit=2))
+        weather_str = sources["weather"]
+        endurain_str = sources["endurain"]
+        context = sources["memory"]
         
         prompt = f"""
         Du bist cyCoachH, angetrieben durch die Endurain-Engine.
@@ -101,17 +135,136 @@ class RobustGateway:
         Wenn du Trainingsempfehlungen gibst, halte dich strikt an die Coach-Ratschläge in den obigen Metriken.
         """
         
-        response = client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model="deepseek-chat",
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
+            temperature=0.7,
+            stream=True
         )
-        return response.choices[0].message.content
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def handle_post(self, post):
+        """
+        Answer one post (runs as a pipeline worker task): a placeholder reply
+        right away, patched with the streamed answer at most every
+        STREAM_EDIT_INTERVAL seconds, and a final patch with the full text.
+        """
+        channel_id, root_id = post['channel_id'], post['id']
+        reply_id = await self.send_reply(channel_id, PLACEHOLDER, root_id)
+        reply, last_edit = "", time.monotonic()
+        try:
+            async for delta in self.think(post.get('message', '')):
+                reply += delta
+                if reply_id and time.monotonic() - last_edit >= STREAM_EDIT_INTERVAL:
+                    await self.edit_reply(reply_id, reply + STREAM_CURSOR)
+                    last_edit = time.monotonic()
+        except Exception as e:
+            # Don't leave the placeholder (or half an answer) looking like work in progress
+            reply += f"\n\n_(Antwort abgebrochen: {e})_"
+            raise
+        finally:
+            reply = reply or "_(Keine Antwort erhalten.)_"
+            if not reply_id:
+                await self.send_reply(channel_id, reply, root_id)
+            elif not await self.edit_reply(reply_id, reply):
+                await self.send_reply(channel_id, reply, root_id)  # e.g. the placeholder was deleted
+
+    async def run(self):
+        """Authenticate, then listen; all HTTP goes through one pooled session."""
+        try:
+            if await self.get_bot_id():
+                await self.listen()
+        finally:
+            await close_session()
+
+    async def dispatch(self, post, channel_type):
+        """Dedup, filter and queue one post (from the websocket or a catch-up)."""
+        post_id = post['id']
+        if not self.processed_posts.add(post_id, post.get('create_at')):
+            return
+
+        if post.get('user_id') == self.bot_user_id: return
+
+        msg_text = post.get('message', '')
+        if channel_type == 'D' or "@cycoach" in msg_text.lower():
+            console.print(f"[yellow]Incoming: {msg_text}[/yellow]")
+            if not self.pipeline.submit(post['channel_id'], post):
+                # Backpressure: answer at once instead of queueing without bound
+                console.print(f"[red]Queue full ({self.pipeline.max_pending}), rejecting {post_id}[/red]")
+                await self.send_reply(post['channel_id'], BUSY_REPLY, post['id'])
+
+    async def get_json(self, path, params=None):
+        async with get_session().get(f"{BASE_API}{path}", params=params, headers=self.headers) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def posts_since(self, channel_id, since):
+        """Posts of a channel created after `since` (ms), newest first, paging back until reaching it."""
+        posts = []
+        for page in range(CATCHUP_MAX_PAGES):
+            data = await self.get_json(
+                f"/channels/{channel_id}/posts", {"page": page, "per_page": CATCHUP_PAGE_SIZE}
+            )
+            batch = [data['posts'][post_id] for post_id in data.get('order', [])]
+            posts += [p for p in batch if p.get('create_at', 0) > since and not p.get('delete_at')]
+            if len(batch) < CATCHUP_PAGE_SIZE or any(p.get('create_at', 0) <= since for p in batch):
+                break
+        else:
+            console.print(
+                f"[yellow]Catch-up: channel {channel_id} has more than {CATCHUP_MAX_PAGES} pages of "
+                f"missed posts, only the newest {len(posts)} are handled[/yellow]"
+            )
+        return posts
+
+    async def catch_up(self, since):
+        """Fetch the posts created after `since` (ms) and dispatch them, oldest first."""
+        try:
+            channels = []
+            for team in await self.get_json("/users/me/teams"):
+                channels += await self.get_json(f"/users/me/teams/{team['id']}/channels")
+            # Channels without newer posts cost no request; the others are fetched concurrently
+            active = {c['id']: c for c in channels if c.get('last_post_at', 0) > since}
+            results = await asyncio.gather(*(self.posts_since(cid, since) for cid in active))
+        except HTTP_ERRORS as e:
+            console.print(f"[red]Catch-up failed: {e}[/red]")
+            return
+
+        missed = sorted(
+            ((post, active[post['channel_id']]['type']) for posts in results for post in posts),
+            key=lambda item: item[0].get('create_at', 0)
+        )
+        fresh = [(post, channel_type) for post, channel_type in missed if post['id'] not in self.processed_posts]
+        if fresh:
+            console.print(f"[yellow]Catch-up: {len(fresh)} posts missed while disconnected[/yellow]")
+        for post, channel_type in fresh:
+            await self.dispatch(post, channel_type)
+
+    def _catch_up_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            console.print(f"[red]Catch-up failed: {task.exception()!r}[/red]")
+
+    async def _save_seen(self):
+        while True:
+            await asyncio.sleep(SAVE_INTERVAL)
+            self.processed_posts.save()
 
     async def listen(self):
         """Main WebSocket Loop."""
         console.print(f"[dim]Connecting to WebSocket: {WS_URL}[/dim]")
-        
+        self.pipeline.start()
+        saver = asyncio.create_task(self._save_seen())
+        try:
+            await self._listen()
+        finally:
+            saver.cancel()
+            if self.catchup_task:
+                self.catchup_task.cancel()
+            self.processed_posts.save(force=True)
+            await self.pipeline.stop()
+
+    async def _listen(self):
         async for websocket in websockets.connect(WS_URL):
             try:
                 auth_payload = {
@@ -126,25 +279,19 @@ class RobustGateway:
                     data = json.loads(message)
                     if data.get('event') == 'hello':
                         console.print("[bold green]Gateway Active: Listening...[/bold green]")
+                        # Live events flow again; fetch what was posted in the gap alongside them.
+                        # The gap is fixed now, before live posts move the newest create_at past it.
+                        since = self.processed_posts.since(CATCHUP_MAX_AGE)
+                        self.processed_posts.mark_now()
+                        if since is not None:  # None on the very first start: nothing to catch up on
+                            self.catchup_task = asyncio.create_task(self.catch_up(since))
+                            self.catchup_task.add_done_callback(self._catch_up_done)
                         continue
                     if data.get('event') != 'posted':
                         continue
 
                     post = json.loads(data['data']['post'])
-                    post_id = post['id']
-                    if post_id in self.processed_posts: continue
-                    self.processed_posts.add(post_id)
-                    if len(self.processed_posts) > 100: self.processed_posts.pop()
-                    
-                    if post.get('user_id') == self.bot_user_id: continue
-
-                    msg_text = post.get('message', '')
-                    channel_type = data['data'].get('channel_type')
-                    
-                    if channel_type == 'D' or "@cycoach" in msg_text.lower():
-                        console.print(f"[yellow]Incoming: {msg_text}[/yellow]")
-                        reply = self.think(msg_text)
-                        self.send_reply(post['channel_id'], reply, post['id'])
+                    await self.dispatch(post, data['data'].get('channel_type'))
 
             except websockets.ConnectionClosed:
                 console.print("[red]Connection Lost. Reconnecting in 5s...[/red]")
@@ -155,8 +302,7 @@ class RobustGateway:
 
 if __name__ == "__main__":
     bot = RobustGateway()
-    if bot.get_bot_id():
-        try:
-            asyncio.run(bot.listen())
-        except KeyboardInterrupt:
-            print("\nExiting.")
\ No newline at end of file
+    try:
+        asyncio.run(bot.run())
+    except KeyboardInterrupt:
+        print("\nExiting.")
\ No newline at end of file
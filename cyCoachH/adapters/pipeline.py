@@ -0,0 +1,130 @@
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from rich.console import Console
+
+# --- Configuration ---
+WORKERS = int(os.getenv("GATEWAY_WORKERS", 4))           # Replies built in parallel
+MAX_PENDING = int(os.getenv("GATEWAY_QUEUE_SIZE", 32))   # Queued + running messages before rejecting
+STATS_INTERVAL = int(os.getenv("GATEWAY_STATS_INTERVAL", 300))  # Seconds between metric log lines
+
+console = Console()
+
+
+class MessagePipeline:
+    """
+    Bounded work queue between the websocket loop and a pool of workers.
+
+    The websocket loop only enqueues. A coroutine handler runs in one of
+    `workers` tasks on the same event loop; a plain function runs on a thread
+    pool of that size, so blocking work never stalls the loop. Messages of
+    one channel are handled strictly in order, one at a time; different
+    channels run in parallel and take turns, so one busy channel cannot
+    starve the others.
+    submit() never blocks: once MAX_PENDING messages are waiting it returns
+    False and the caller decides how to shed the load.
+    """
+
+    def __init__(self, handler, workers: int = WORKERS, max_pending: int = MAX_PENDING):
+        self.handler = handler  # handler(job): coroutine function, or blocking function for the thread pool
+        self.is_async = asyncio.iscoroutinefunction(handler)
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.executor = None if self.is_async else ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="gateway-worker"
+        )
+        self.channels = {}  # channel_id -> deque of (enqueued_at, job); head is queued or running
+        self.ready = None   # asyncio.Queue of channel ids with work, each at most once
+        self.tasks = []
+        self.pending = 0
+        self.running = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "max_depth": 0}
+        self.wait_total = 0.0
+        self.work_total = 0.0
+
+    def start(self):
+        """Spawn the worker tasks; call from inside the running event loop."""
+        self.ready = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if STATS_INTERVAL > 0:
+            self.tasks.append(asyncio.create_task(self._report()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, channel_id, job) -> bool:
+        """Queue a job behind earlier ones of the same channel; False if the queue is full."""
+        if self.pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            return False
+        self.pending += 1
+        self.counters["submitted"] += 1
+        self.counters["max_depth"] = max(self.counters["max_depth"], self.pending)
+        queue = self.channels.get(channel_id)
+        if queue is None:
+            self.channels[channel_id] = deque([(time.monotonic(), job)])
+            self.ready.put_nowait(channel_id)
+        else:
+            queue.append((time.monotonic(), job))  # Picked up when the channel's current job is done
+        return True
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            channel_id = await self.ready.get()
+            queue = self.channels[channel_id]
+            enqueued_at, job = queue[0]
+            started = time.monotonic()
+            self.wait_total += started - enqueued_at
+            self.running += 1
+            try:
+                if self.is_async:
+                    await self.handler(job)
+                else:
+                    await loop.run_in_executor(self.executor, self.handler, job)
+                self.counters["completed"] += 1
+            except Exception as e:
+                self.counters["failed"] += 1
+                console.print(f"[red]Worker failed on channel {channel_id}: {e}[/red]")
+            finally:
+                self.running -= 1
+                self.work_total += time.monotonic() - started
+                self.pending -= 1
+                queue.popleft()
+                if queue:
+                    self.ready.put_nowait(channel_id)  # Back of the line: channels take turns
+                else:
+                    del self.channels[channel_id]
+
+    def stats(self) -> dict:
+        """Queue depth, in-flight work, counters and average wait/handling time (seconds)."""
+        done = self.counters["completed"] + self.counters["failed"]
+        return {
+            "depth": self.pending - self.running,
+            "running": self.running,
+            "channels": len(self.channels),
+            "capacity": self.max_pending,
+            **self.counters,
+            "avg_wait": round(self.wait_total / done, 3) if done else 0.0,
+            "avg_work": round(self.work_total / done, 3) if done else 0.0,
+        }
+
+    async def _report(self):
+        last = None
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            stats = self.stats()
+            if stats != last:  # Stay quiet while idle
+                console.print(
+                    f"[dim]Pipeline: {stats['depth']} queued, {stats['running']} running, "
+                    f"{stats['completed']} done, {stats['failed']} failed, {stats['rejected']} rejected, "
+                    f"max depth {stats['max_depth']}/{stats['capacity']}, "
+                    f"wait {stats['avg_wait']}s, work {stats['avg_work']}s[/dim]"
+                )
+            last = stats
@@ -1,9 +1,11 @@
 import sys
 import os
+import time
 from datetime import datetime
 from pathlib import Path
 from rich.console import Console
 from rich.markdown import Markdown
+from rich.live import Live
 from rich.prompt import Prompt
 from rich.panel import Panel
 from dotenv import load_dotenv
@@ -26,6 +28,7 @@ BASE_URL = "https://api.deepseek.com"
 
 console = Console()
 client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+RENDER_INTERVAL = 0.1  # Seconds between Markdown re-renders while streaming
 
 def save_interaction(user_input, agent_response):
     """Appends the conversation to today's daily note."""
@@ -43,6 +46,12 @@ def save_interaction(user_input, agent_response):
     except Exception as e:
         console.print(f"[red]Failed to auto-journal: {e}[/red]")
 
+def stream_text(stream):
+    """Text deltas of a streamed chat completion."""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
 def start_terminal_chat():
     mem = MemorySystem()
     
@@ -64,7 +73,7 @@ def start_terminal_chat():
             with console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
                 # 1. Search Memory
                 hits = mem.search(user_input, limit=3)
-                context_str = "\n".join([f"- {h['content'][:300]}" for h in hits])
+                context_str = "\n".join([f"- {h['snippet']}" for h in hits])
                 
                 # 2. Get Time
                 now_str = datetime.now().strftime("%A, %Y-%m-%d %H:%M")
@@ -83,24 +92,33 @@ def start_terminal_chat():
                 Beantworte die Anfrage des Nutzers. Sei knapp. Wenn die Erinnerung spezifische Details liefert, zitiere sie.
                 """
                 
-                response = client.chat.completions.create(
+                stream = client.chat.completions.create(
                     model="deepseek-chat",
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_input}
                     ],
-                    temperature=0.7
+                    temperature=0.7,
+                    stream=True
                 )
-                
-                reply = response.choices[0].message.content
-                
-                # 4. Display
-                console.print(f"\n[bold magenta]cyCoachH:[/bold magenta]")
-                console.print(Markdown(reply))
-                console.print("\n" + "-"*30)
-                
-                # 5. Auto-Journal
-                save_interaction(user_input, reply)
+                deltas = stream_text(stream)
+                reply = next(deltas, "")  # Spinner until the first token
+
+            # 4. Display, token by token
+            console.print(f"\n[bold magenta]cyCoachH:[/bold magenta]")
+            # Live crops to the screen height while streaming and prints the full answer when it stops
+            with Live(Markdown(reply), console=console) as live:
+                last_render = time.monotonic()
+                for delta in deltas:
+                    reply += delta
+                    if time.monotonic() - last_render >= RENDER_INTERVAL:
+                        live.update(Markdown(reply))
+                        last_render = time.monotonic()
+                live.update(Markdown(reply))
+            console.print("\n" + "-"*30)
+
+            # 5. Auto-Journal
+            save_interaction(user_input, reply)
 
         except KeyboardInterrupt:
             console.print("\n[yellow]Interrupted. Exiting.[/yellow]")
@@ -1,9 +1,10 @@
 import os
 import sys
+import asyncio
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 from rich.console import Console
 
 # --- Path Setup ---
@@ -12,9 +13,9 @@ sys.path.append(str(PROJECT_ROOT))
 
 try:
     from memory.ingest import MemorySystem
-    from skills.weather import get_current_weather
-    # REPLACED: runalyze -> endurain
-    from skills.endurain import calculate_metrics
+    # Weather, Endurain metrics and memory hits, gathered concurrently
+    from skills.registry import gather_context, coach_sources, drain
+    from skills.async_http import close_session
 except ImportError:
     print("Error: Could not import internal modules. Check skills folder.")
     sys.exit(1)
@@ -29,7 +30,8 @@ if not API_KEY:
     console.print("[red]Error: DEEPSEEK_API_KEY not found in .env[/red]")
     sys.exit(1)
 
-client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+client = AsyncOpenAI(api_key=API_KEY, base_url=BASE_URL)
+HEARTBEAT_QUERY = "current priorities urgent todo project status training plan"
 
 def get_todays_log():
     today = datetime.now().strftime("%Y-%m-%d")
@@ -40,17 +42,25 @@ def get_todays_log():
 
 def run_heartbeat():
     console.print(f"[bold blue]💓 cyCoachH Heartbeat at {datetime.now().strftime('%H:%M')}[/bold blue]")
+    asyncio.run(_heartbeat())
 
+async def _heartbeat():
+    try:
+        await _beat()
+        await drain()  # Sources that missed their deadline finish for the next beat
+    finally:
+        await close_session()
+
+async def _beat():
     mem = MemorySystem()
     current_time = datetime.now().strftime("%A, %Y-%m-%d %H:%M")
     todays_log = get_todays_log()
-    weather_str = get_current_weather()
-    
-    # Calculate Fitness/Fatigue using local Endurain engine
-    endurain_str = calculate_metrics()
-    
-    context_hits = mem.search("current priorities urgent todo project status training plan", limit=3)
-    context_str = "\n".join([f"- {h['content'][:200]}..." for h in context_hits])
+
+    # Fitness/Fatigue from the local Endurain engine, weather and memory, each with its own deadline
+    context = await gather_context(coach_sources(mem, HEARTBEAT_QUERY, limit=3))
+    weather_str = context["weather"]
+    endurain_str = context["endurain"]
+    context_str = context["memory"]
 
     prompt = f"""
     Du bist cyCoachH, angetrieben durch Endurain-Logik.
@@ -78,7 +88,7 @@ def run_heartbeat():
     """
 
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="deepseek-chat",
             messages=[
                 {"role": "system", "content": "Du bist ein prägnanter Systemautomatisierungs-Agent."},
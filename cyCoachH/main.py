@@ -9,7 +9,7 @@ sys.path.append(str(PROJECT_ROOT))
 
 def main():
     parser = argparse.ArgumentParser(description="cyCoachH Controller")
-    parser.add_argument("mode", choices=["chat", "heartbeat", "ingest", "mattermost"], help="Mode to run the agent in")
+    parser.add_argument("mode", choices=["chat", "heartbeat", "ingest", "watch", "memoryd", "migrate", "mattermost"], help="Mode to run the agent in")
     
     args = parser.parse_args()
     
@@ -24,15 +24,30 @@ def main():
             
         elif args.mode == "ingest":
             from memory.ingest import MemorySystem
-            mem = MemorySystem()
+            mem = MemorySystem(use_daemon=False)
             mem.ingest_vault()
 
+        elif args.mode == "watch":
+            from memory.watch import watch_vault
+            watch_vault()
+
+        elif args.mode == "memoryd":
+            from memory.daemon import serve
+            serve()
+
+        elif args.mode == "migrate":
+            from memory.ingest import DB_PATH, EMBEDDING_DTYPE
+            from memory.migrate import migrate
+            from memory.store import connect
+            conn = connect(DB_PATH)
+            migrate(conn, dtype=EMBEDDING_DTYPE)
+            conn.close()
+
         elif args.mode == "mattermost":
             # Pointing to the new ROBUST raw gateway
             from adapters.mattermost_raw import RobustGateway
             bot = RobustGateway()
-            if bot.get_bot_id():
-                asyncio.run(bot.listen())
+            asyncio.run(bot.run())
             
     except KeyboardInterrupt:
         sys.exit(0)
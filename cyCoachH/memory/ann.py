@@ -0,0 +1,189 @@
+import os
+import sys
+import argparse
+import numpy as np
+from pathlib import Path
+from rich.console import Console
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+# --- Configuration ---
+INDEX_PATH = Path("memory/index")
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", 8))            # Lists scanned per query
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", 2048))  # Below this, exact scan wins anyway
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+console = Console()
+
+
+class IVFIndex:
+    """
+    Pure-NumPy IVF-flat index over normalized embeddings.
+    Vectors are bucketed by their nearest k-means centroid; a query only scans
+    the members of its `nprobe` closest buckets. The vectors themselves stay in
+    MemorySystem's matrix - the index only stores centroids and chunk ids.
+    """
+
+    FILENAME = "ivf.npz"
+
+    def __init__(self, centroids, ids=None, lists=None, trained_size=0):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+        self.lists = np.asarray(lists if lists is not None else [], dtype=np.int32)
+        self.trained_size = trained_size
+        self._members = None
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # --- Training ---
+    @classmethod
+    def train(cls, ids, matrix, nlist=None, seed=0):
+        """Spherical k-means on a sample of the matrix, then assign every vector."""
+        n = len(matrix)
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample = matrix[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            # Re-seed empty lists with random sample points
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        index = cls(centroids, trained_size=n)
+        index.add(ids, matrix)
+        return index
+
+    def needs_retrain(self):
+        """Retrain once the corpus has grown or shrunk well past what the centroids saw."""
+        size = len(self.ids)
+        return size > 4 * self.trained_size or size < self.trained_size // 4
+
+    # --- Incremental updates ---
+    def _assign(self, vectors, block=8192):
+        out = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), block):
+            out[start:start + block] = np.argmax(vectors[start:start + block] @ self.centroids.T, axis=1)
+        return out
+
+    def add(self, ids, vectors):
+        """Insert or re-assign vectors (by chunk id)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        self.remove(ids)
+        self.ids = np.concatenate([self.ids, ids])
+        self.lists = np.concatenate([self.lists, self._assign(np.asarray(vectors, dtype=np.float32))])
+        self._members = None
+
+    def remove(self, ids):
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(ids) == 0 or len(self.ids) == 0:
+            return
+        keep = ~np.isin(self.ids, ids)
+        if not keep.all():
+            self.ids, self.lists = self.ids[keep], self.lists[keep]
+            self._members = None
+
+    # --- Query ---
+    def _build_members(self):
+        order = np.argsort(self.lists, kind="stable")
+        bounds = np.searchsorted(self.lists[order], np.arange(self.nlist + 1))
+        sorted_ids = self.ids[order]
+        self._members = [sorted_ids[bounds[i]:bounds[i + 1]] for i in range(self.nlist)]
+
+    def candidates(self, query_vec, nprobe=None):
+        """Chunk ids in the `nprobe` lists closest to the query."""
+        if self._members is None:
+            self._build_members()
+        nprobe = min(nprobe or ANN_NPROBE, self.nlist)
+        probe = np.argpartition(-(self.centroids @ query_vec), nprobe - 1)[:nprobe]
+        return np.concatenate([self._members[i] for i in probe])
+
+    # --- Persistence ---
+    def save(self, index_dir=INDEX_PATH):
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = index_dir / f".{self.FILENAME}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.centroids, ids=self.ids, lists=self.lists,
+                     trained_size=np.int64(self.trained_size))
+        os.replace(tmp_path, index_dir / self.FILENAME)
+
+    @classmethod
+    def load(cls, index_dir=INDEX_PATH, dim=None):
+        """Load a persisted index, or None if missing, unreadable or of another dimension."""
+        path = Path(index_dir) / cls.FILENAME
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                index = cls(data["centroids"], data["ids"], data["lists"], int(data["trained_size"]))
+        except Exception as e:
+            console.print(f"[yellow]Ignoring unreadable ANN index {path}: {e}[/yellow]")
+            return None
+        if dim is not None and index.centroids.shape[1] != dim:
+            return None
+        return index
+
+
+def evaluate_recall(matrix, ids, index, k=5, n_queries=100, nprobe=None, seed=0):
+    """
+    Recall@k of IVF candidates vs. exact search, using stored vectors
+    (lightly perturbed) as queries. Returns the mean recall in [0, 1].
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.asarray(ids, dtype=np.int64)
+    rows = {chunk_id: idx for idx, chunk_id in enumerate(ids.tolist())}
+    n_queries = min(n_queries, len(matrix))
+    k = min(k, len(matrix))
+
+    queries = matrix[rng.choice(len(matrix), n_queries, replace=False)]
+    queries = queries + rng.normal(0, 0.02, queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    hits = 0
+    for query in queries:
+        exact = set(ids[np.argpartition(-(matrix @ query), k - 1)[:k]].tolist())
+        candidate_rows = [rows[c] for c in index.candidates(query, nprobe).tolist() if c in rows]
+        if candidate_rows:
+            scores = matrix[candidate_rows] @ query
+            top = np.argsort(-scores)[:k]
+            approx = {ids[candidate_rows[i]] for i in top}
+            hits += len(exact & approx)
+    return hits / (n_queries * k)
+
+
+# --- CLI: report recall of the persisted index ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report ANN recall@k against exact search")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    from memory.ingest import MemorySystem
+    mem = MemorySystem()
+    if mem.ann is None:
+        console.print(f"[yellow]No ANN index (needs >= {ANN_MIN_VECTORS} chunks, have {len(mem.matrix_ids)}).[/yellow]")
+        sys.exit(0)
+
+    console.print(f"[bold]IVF index: {len(mem.ann)} vectors in {mem.ann.nlist} lists[/bold]")
+    for nprobe in args.nprobe:
+        recall = evaluate_recall(mem.embedding_matrix, mem.matrix_ids, mem.ann, args.k, args.queries, nprobe)
+        console.print(f"nprobe={nprobe:>3}  recall@{args.k} = {recall:.3f}")
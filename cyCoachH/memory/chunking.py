@@ -0,0 +1,99 @@
+import os
+import re
+import hashlib
+from datetime import datetime
+from typing import List
+
+# --- Configuration ---
+# bge-small truncates at 512 tokens; the word-based estimate undercounts
+# German compounds, so keep a healthy margin below the hard limit.
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 350))
+TOKENS_PER_WORD = 1.3
+
+HEADING_RE = re.compile(r"^#{1,3}\s")
+DAILY_DATE_RE = re.compile(r"^daily/(\d{4}-\d{2}-\d{2})\.md$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (words x 1.3), good enough for chunk sizing."""
+    return int(len(text.split()) * TOKENS_PER_WORD)
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of a chunk's text, used to skip re-embedding."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def doc_type_for(rel_path: str) -> str:
+    """'daily' for daily logs, otherwise the lower-cased file stem (system, soul, ...)."""
+    parts = rel_path.replace("\\", "/").split("/")
+    if len(parts) > 1 and parts[0] == "daily":
+        return "daily"
+    return os.path.splitext(parts[-1])[0].lower()
+
+
+def doc_date_for(rel_path: str, mtime: float) -> str:
+    """ISO date of a document: the log date for daily/YYYY-MM-DD.md, else its mtime date."""
+    match = DAILY_DATE_RE.search(rel_path.replace("\\", "/"))
+    if match:
+        return match.group(1)
+    return datetime.fromtimestamp(mtime).date().isoformat()
+
+
+def _split_sections(text: str) -> List[str]:
+    """Split Markdown at headings (#, ##, ###), keeping each heading with its body."""
+    sections, current = [], []
+    for line in text.splitlines():
+        if HEADING_RE.match(line) and current:
+            sections.append("\n".join(current))
+            current = [line]
+        else:
+            current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return [section for section in sections if section.strip()]
+
+
+def _split_oversized(section: str, max_tokens: int) -> List[str]:
+    """Fallback for a section above the limit: split by paragraph, then by words."""
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", section):
+        if not paragraph.strip():
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        words = paragraph.split()
+        step = max(1, int(max_tokens / TOKENS_PER_WORD))
+        pieces.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+    return pieces
+
+
+def split_markdown(text: str, max_tokens: int = None) -> List[str]:
+    """
+    Heading-aware chunking.
+    Sections are packed greedily from the top until the next one would exceed
+    max_tokens, so appending to a file only ever changes its last chunk(s).
+    """
+    max_tokens = max_tokens or CHUNK_MAX_TOKENS
+    if estimate_tokens(text) <= max_tokens:
+        return [text] if text.strip() else []
+
+    pieces = []
+    for section in _split_sections(text):
+        if estimate_tokens(section) > max_tokens:
+            pieces.extend(_split_oversized(section, max_tokens))
+        else:
+            pieces.append(section)
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import socket
+import threading
+import socketserver
+from pathlib import Path
+from rich.console import Console
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+# --- Configuration ---
+SOCKET_PATH = Path(os.getenv("MEMORY_SOCKET", "memory/memoryd.sock"))
+CLIENT_TIMEOUT = float(os.getenv("MEMORY_SOCKET_TIMEOUT", 10.0))
+console = Console()
+
+# Protocol: one JSON object per line in each direction.
+#   -> {"op": "search", "query": "...", "limit": 5, ...}
+#   <- {"ok": true, "result": [...]}  or  {"ok": false, "error": "..."}
+
+
+class MemoryClient:
+    """Thin client for the memory daemon; one short-lived connection per call."""
+
+    def __init__(self, socket_path=SOCKET_PATH, timeout=CLIENT_TIMEOUT):
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+
+    @classmethod
+    def connect(cls, socket_path=SOCKET_PATH):
+        """Return a client if a daemon answers on the socket, else None."""
+        if not Path(socket_path).exists():
+            return None
+        client = cls(socket_path, timeout=1.0)
+        try:
+            client.call("ping")
+        except (OSError, ValueError, RuntimeError):
+            return None  # No daemon, or one that answers garbage/errors: search in-process
+        client.timeout = CLIENT_TIMEOUT
+        return client
+
+    def call(self, op, **params):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps({"op": op, **params}).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        if not line:
+            raise ConnectionError("Memory daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise RuntimeError(f"Memory daemon error: {response.get('error')}")
+        return response.get("result")
+
+    def search(self, query, **kwargs):
+        return self.call("search", query=query, **kwargs)
+
+    def embed(self, texts):
+        return self.call("embed", texts=list(texts))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                result = self.server.dispatch(request)
+                response = {"ok": True, "result": result}
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class MemoryDaemon(socketserver.ThreadingUnixStreamServer):
+    """Keeps one MemorySystem (model, matrix, ANN index) warm for every mode."""
+
+    daemon_threads = True
+
+    def __init__(self, mem, socket_path=SOCKET_PATH):
+        self.mem = mem
+        # Searches read SQLite through a pool, but the in-memory matrix and
+        # ANN index are swapped by refresh(); serialize access to them
+        self.lock = threading.Lock()
+        super().__init__(str(socket_path), _RequestHandler)
+
+    def dispatch(self, request):
+        op = request.pop("op", None)
+        if op == "ping":
+            return "pong"
+        with self.lock:
+            if op == "search":
+                # search() picks up ingests done by other processes (e.g. `main.py watch`)
+                return self.mem.search(request.pop("query"), **request)
+            if op == "embed":
+                embeddings = self.mem.embedding_model.embed(request["texts"])
+                return [embedding.tolist() for embedding in embeddings]
+        raise ValueError(f"Unknown op: {op}")
+
+
+def serve(socket_path=SOCKET_PATH):
+    """Run the memory daemon until interrupted."""
+    from memory.ingest import MemorySystem
+
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        if MemoryClient.connect(socket_path):
+            console.print(f"[yellow]Memory daemon already running on {socket_path}[/yellow]")
+            return
+        socket_path.unlink()  # Stale socket from a crashed daemon
+
+    mem = MemorySystem(use_daemon=False)
+    mem.embedding_model  # Warm up the model now rather than on the first request
+
+    server = MemoryDaemon(mem, socket_path)
+    os.chmod(socket_path, 0o600)
+    console.print(f"[bold green]Memory daemon listening on {socket_path}[/bold green]")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    try:
+        serve()
+    except KeyboardInterrupt:
+        print("\nExiting.")
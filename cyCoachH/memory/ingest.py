@@ -1,39 +1,147 @@
 import os
+import sys
 import sqlite3
 import time
 import json
-import pickle
+import re
+import threading
 import numpy as np
 from pathlib import Path
 from typing import List, Dict, Any
-from fastembed import TextEmbedding
-from rank_bm25 import BM25Okapi
 from rich.console import Console
 from rich.table import Table
+from rich.progress import Progress
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from memory.migrate import migrate
+from memory.store import MemoryStore
+from memory.vectors import encode_embedding, decode_embedding
+from memory.daemon import MemoryClient
+from memory.ann import IVFIndex, INDEX_PATH, ANN_MIN_VECTORS, evaluate_recall
+from memory.chunking import split_markdown, content_hash, doc_type_for, doc_date_for, estimate_tokens
+from memory.partitions import ColdPartitions, hot_cutoff, day_number, recency_factor
+from memory.snippets import passage_spans, pack_spans, unpack_spans, query_terms, best_snippet
 
 # --- Configuration ---
 DB_PATH = Path("memory/db.sqlite")
 VAULT_PATH = Path("memory/vault")
 MODEL_NAME = "BAAI/bge-small-en-v1.5"  # Lightweight, high performance
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")  # or "float16" to halve storage
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+EMBED_PARALLEL = int(os.getenv("EMBED_PARALLEL", 0))  # 0 = all cores, 1 = in-process
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))  # Cached query embeddings (LRU)
+QUERY_CACHE_TOUCH_INTERVAL = 60  # Seconds; avoids a write on every cache hit
+SEARCH_MODE = os.getenv("MEMORY_SEARCH_MODE", "exact")  # "exact" or "ann" (IVF, see memory/ann.py)
+USE_DAEMON = os.getenv("MEMORY_DAEMON", "auto") != "off"  # Use memory/daemon.py when it is running
+RECENCY_HALF_LIFE_DAYS = float(os.getenv("MEMORY_RECENCY_HALF_LIFE", 90))  # 0 disables recency decay
+RECENCY_WEIGHT = float(os.getenv("MEMORY_RECENCY_WEIGHT", 0.5))  # Share of the score that decays
+ARCHIVE_MIN_SCORE = float(os.getenv("MEMORY_ARCHIVE_MIN_SCORE", 0.5))  # Hot hits below this count as weak
 console = Console()
 
 class MemorySystem:
-    def __init__(self):
-        """Initialize DB connection and Embedding Model."""
-        self.conn = sqlite3.connect(DB_PATH)
-        self.conn.row_factory = sqlite3.Row
+    def __init__(self, use_daemon: bool = None):
+        """
+        Initialize DB connection. If the memory daemon is running, searches go
+        through it and nothing heavy is loaded here; otherwise the embedding
+        matrix and ANN index are loaded in-process.
+        """
+        # WAL store: one writer connection (self.conn, used by ingest) and a
+        # pool of read-only connections for search, so a reindex in another
+        # process never blocks chat replies (see memory/store.py)
+        self.store = MemoryStore(DB_PATH)
+        self.conn = self.store.writer
         self._init_db()
         
-        console.print(f"[dim]Loading embedding model: {MODEL_NAME}...[/dim]")
-        self.embedding_model = TextEmbedding(model_name=MODEL_NAME)
+        # The model is loaded on first use: cached queries never need it
+        self._embedding_model = None
         
-        # We load BM25 on startup for the Keyword search part
-        self.bm25 = None
-        self.bm25_corpus_paths = []
-        self._refresh_bm25()
+        # Rows of the embedding matrix are the hot chunks (core documents and
+        # recent daily logs), identified by documents.id. Older daily logs live
+        # in memory-mapped month partitions (memory/partitions.py).
+        # Keyword scoring lives in the persistent documents_fts table.
+        self.embedding_matrix = None
+        self.matrix_ids = []
+        self.matrix_id_array = np.zeros(0, dtype=np.int64)
+        self.matrix_rows = {}
+        self.matrix_days = np.zeros(0, dtype=np.int32)  # Log day per row, for recency decay
+        self.hot_cutoff = hot_cutoff()
+        self.cold = ColdPartitions()
+        self.ann = None  # Optional IVF index persisted under memory/index/
+        self._local_ready = False
+        self._data_version = None
+        self._signature = None
+        # Searches may run on several threads (gateway workers) while refresh()
+        # or an ingest swaps the matrix and ANN index; serialize access to them
+        self.lock = threading.RLock()
+
+        use_daemon = USE_DAEMON if use_daemon is None else use_daemon
+        self.remote = MemoryClient.connect() if use_daemon else None
+        if self.remote is None:
+            self._ensure_local()
+
+    def _ensure_local(self):
+        """Load the embedding matrix and ANN index for in-process search."""
+        if self._local_ready:
+            return
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        self._signature = self._documents_signature()
+        self._load_matrix()
+        self._sync_ann()
+        self._local_ready = True
+
+    def _documents_signature(self, conn=None):
+        return tuple((conn or self.conn).execute(
+            "SELECT count(*), max(id), max(modified_at) FROM documents"
+        ).fetchone())
+
+    def refresh(self):
+        """Reload in-memory indexes if another process has changed the documents table."""
+        if not self._local_ready:
+            return self._ensure_local()
+        if hot_cutoff() != self.hot_cutoff:
+            # A month rolled over into the cold partitions
+            self._load_matrix()
+            self.ann = None
+            self._sync_ann()
+            return
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return  # Nobody else committed since we last looked
+        self._data_version = data_version
+        signature = self._documents_signature()
+        if signature == self._signature:
+            return  # e.g. only the query cache changed
+        self._signature = signature
+        self._load_matrix()
+        self.ann = None
+        self._sync_ann()
+
+    def _mark_synced(self):
+        """
+        After applying our own writes to the matrix: adopt the new signature,
+        unless another process committed since the last load (data_version
+        ignores this connection's own commits). Its chunks are not in the
+        matrix, so the next refresh() must reload instead of skipping them.
+        """
+        if self.conn.execute("PRAGMA data_version").fetchone()[0] == self._data_version:
+            self._signature = self._documents_signature()
+        else:
+            self._data_version = self._signature = None
+
+    @property
+    def embedding_model(self):
+        if self._embedding_model is None:
+            # Imported here: processes that only hit the query cache or the daemon never pay for it
+            from fastembed import TextEmbedding
+            console.print(f"[dim]Loading embedding model: {MODEL_NAME}...[/dim]")
+            self._embedding_model = TextEmbedding(model_name=MODEL_NAME)
+        return self._embedding_model
 
     def _init_db(self):
-        """Create the table if it doesn't exist."""
+        """Create the base table if it doesn't exist, then migrate it to the current schema."""
         query = """
         CREATE TABLE IF NOT EXISTS documents (
             filepath TEXT PRIMARY KEY,
@@ -45,126 +153,597 @@ class MemorySystem:
         self.conn.execute(query)
         self.conn.commit()
 
-    def _refresh_bm25(self):
-        """Load all documents into memory to build the BM25 index."""
-        cursor = self.conn.execute("SELECT filepath, content FROM documents")
-        rows = cursor.fetchall()
-        
+        # Upgrade older databases in place (raw embeddings, FTS5, chunks, ...)
+        migrate(self.conn, dtype=EMBEDDING_DTYPE)
+
+    def _embed_query(self, query: str, conn=None) -> np.ndarray:
+        """
+        Embed a query through the persistent LRU cache (keyed by model + normalized text).
+        Cache writes are best-effort: they are skipped while another process holds the write lock.
+        """
+        text = " ".join(query.lower().split())
+        now = time.time()
+
+        row = (conn or self.conn).execute(
+            "SELECT embedding, last_used FROM query_cache WHERE model = ? AND query = ?",
+            (MODEL_NAME, text)
+        ).fetchone()
+        if row:
+            if now - row["last_used"] > QUERY_CACHE_TOUCH_INTERVAL:
+                try:
+                    with self.store.write(blocking=False) as writer:
+                        writer.execute(
+                            "UPDATE query_cache SET last_used = ? WHERE model = ? AND query = ?",
+                            (now, MODEL_NAME, text)
+                        )
+                except sqlite3.OperationalError:
+                    pass  # e.g. an ingest is writing; touch again next time
+            return decode_embedding(row["embedding"]).astype(np.float32, copy=False)
+
+        embedding = np.asarray(list(self.embedding_model.embed([text]))[0], dtype=np.float32)
+        try:
+            with self.store.write(blocking=False) as writer:
+                writer.execute(
+                    "INSERT OR REPLACE INTO query_cache (model, query, embedding, last_used) VALUES (?, ?, ?, ?)",
+                    (MODEL_NAME, text, encode_embedding(embedding, "float32"), now)
+                )
+                # Evict least recently used entries beyond the size bound
+                writer.execute(
+                    """
+                    DELETE FROM query_cache WHERE rowid IN (
+                        SELECT rowid FROM query_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (QUERY_CACHE_SIZE,)
+                )
+        except sqlite3.OperationalError:
+            pass  # Not cached this time; the reply must not wait for an ingest
+        return embedding
+
+    def _keyword_scores(self, query: str, where: str = "", params=(), conn=None) -> Dict[int, float]:
+        """BM25 scores from the FTS5 index, keyed by chunk id (matches only, optionally filtered)."""
+        tokens = re.findall(r"\w+", query.lower())
+        if not tokens:
+            return {}
+
+        # Quote every token so FTS5 operators in user text are taken literally
+        match_expr = " OR ".join(f'"{token}"' for token in dict.fromkeys(tokens))
+        conn = conn or self.conn
+        if where:
+            cursor = conn.execute(
+                f"""
+                SELECT documents_fts.rowid, -bm25(documents_fts) AS score
+                FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+                WHERE documents_fts MATCH ? AND {where}
+                """,
+                (match_expr, *params)
+            )
+        else:
+            cursor = conn.execute(
+                "SELECT rowid, -bm25(documents_fts) AS score FROM documents_fts WHERE documents_fts MATCH ?",
+                (match_expr,)
+            )
+        return {row["rowid"]: row["score"] for row in cursor.fetchall()}
+
+    @staticmethod
+    def _filter_clause(doc_type=None, path_prefix=None, since=None, until=None):
+        """SQL predicate (on alias d) + params for metadata filters; served by the doc_type/doc_date/filepath indexes."""
+        clauses, params = [], []
+        if doc_type:
+            doc_types = [doc_type] if isinstance(doc_type, str) else list(doc_type)
+            clauses.append(f"d.doc_type IN ({','.join('?' * len(doc_types))})")
+            params += doc_types
+        if path_prefix:
+            # Range instead of LIKE so the (filepath, chunk_index) index is used
+            clauses.append("d.filepath >= ? AND d.filepath < ?")
+            params += [path_prefix, path_prefix + "\U0010ffff"]
+        if since:
+            clauses.append("d.doc_date >= ?")
+            params.append(str(since)[:10])
+        if until:
+            clauses.append("d.doc_date <= ?")
+            params.append(str(until)[:10])
+        return " AND ".join(clauses), params
+
+    def _filtered_rows(self, where, params, conn=None):
+        """Matrix rows of the hot chunks matching a filter clause."""
+        cursor = (conn or self.conn).execute(
+            f"SELECT d.id FROM documents d WHERE {where} AND (d.doc_type != 'daily' OR d.doc_date >= ?)",
+            (*params, self.hot_cutoff)
+        )
+        return np.fromiter(
+            (self.matrix_rows[row[0]] for row in cursor if row[0] in self.matrix_rows), dtype=np.int64
+        )
+
+    def _is_hot(self, doc_type, doc_date):
+        return doc_type != "daily" or (doc_date or "") >= self.hot_cutoff
+
+    def _load_matrix(self):
+        """Load the hot embeddings once into a contiguous float32 matrix (from one snapshot)."""
+        self.hot_cutoff = hot_cutoff()
+        with self.store.read() as conn:
+            cursor = conn.execute(
+                """
+                SELECT id, embedding, doc_type, doc_date FROM documents
+                WHERE embedding IS NOT NULL AND (doc_type != 'daily' OR doc_date >= ?)
+                ORDER BY id
+                """,
+                (self.hot_cutoff,)
+            )
+            rows = cursor.fetchall()
+
         if not rows:
+            self.embedding_matrix = None
+            self.matrix_ids = []
+            self.matrix_id_array = np.zeros(0, dtype=np.int64)
+            self.matrix_rows = {}
+            self.matrix_days = np.zeros(0, dtype=np.int32)
+            return
+
+        # Zero-copy views over the raw BLOBs, stacked once into the matrix
+        vectors = [decode_embedding(row["embedding"]) for row in rows]
+        self.embedding_matrix = np.vstack(vectors).astype(np.float32, copy=False)
+        self.matrix_ids = [row["id"] for row in rows]
+        self.matrix_id_array = np.asarray(self.matrix_ids, dtype=np.int64)
+        self.matrix_rows = {chunk_id: idx for idx, chunk_id in enumerate(self.matrix_ids)}
+        self.matrix_days = np.asarray(
+            [day_number(row["doc_type"], row["doc_date"]) for row in rows], dtype=np.int32
+        )
+
+    def _update_matrix(self, updates, removed=(), days=None):
+        """
+        Apply {chunk_id: embedding} updates in place, append new rows, drop removed ones.
+        days maps chunk ids to their log day (see memory/partitions.py).
+        """
+        if self.embedding_matrix is None:
+            self._load_matrix()
             return
+        days = days or {}
 
-        tokenized_corpus = [row["content"].lower().split() for row in rows]
-        self.bm25 = BM25Okapi(tokenized_corpus)
-        self.bm25_corpus_paths = [row["filepath"] for row in rows]
+        drop = [self.matrix_rows[chunk_id] for chunk_id in removed if chunk_id in self.matrix_rows]
+        if drop:
+            self.embedding_matrix = np.delete(self.embedding_matrix, drop, axis=0)
+            self.matrix_days = np.delete(self.matrix_days, drop)
+            dropped = set(drop)
+            self.matrix_ids = [chunk_id for idx, chunk_id in enumerate(self.matrix_ids) if idx not in dropped]
+            self.matrix_rows = {chunk_id: idx for idx, chunk_id in enumerate(self.matrix_ids)}
 
-    def ingest_vault(self):
-        """Scan the vault and update changed files."""
+        new_ids, new_vectors = [], []
+        for chunk_id, embedding in updates.items():
+            idx = self.matrix_rows.get(chunk_id)
+            if idx is None:
+                new_ids.append(chunk_id)
+                new_vectors.append(np.asarray(embedding, dtype=np.float32))
+            else:
+                self.embedding_matrix[idx] = embedding
+                self.matrix_days[idx] = days.get(chunk_id, self.matrix_days[idx])
+
+        if new_vectors:
+            self.embedding_matrix = np.ascontiguousarray(
+                np.vstack([self.embedding_matrix] + new_vectors)
+            )
+            self.matrix_days = np.concatenate([
+                self.matrix_days, np.asarray([days.get(c, -1) for c in new_ids], dtype=np.int32)
+            ])
+            for chunk_id in new_ids:
+                self.matrix_rows[chunk_id] = len(self.matrix_ids)
+                self.matrix_ids.append(chunk_id)
+
+        self.matrix_id_array = np.asarray(self.matrix_ids, dtype=np.int64)
+        if not self.matrix_ids:
+            self.embedding_matrix = None
+
+    def _sync_ann(self, updates=None, removed=()):
+        """Keep the persisted IVF index in step with the matrix, (re)training when needed."""
+        if self.embedding_matrix is None or len(self.matrix_ids) < ANN_MIN_VECTORS:
+            self.ann = None
+            return
+
+        changed = False
+        if self.ann is None:
+            self.ann = IVFIndex.load(INDEX_PATH, dim=self.embedding_matrix.shape[1])
+            if self.ann is not None:
+                # Reconcile with the DB; another process may have ingested meanwhile
+                current = np.asarray(self.matrix_ids, dtype=np.int64)
+                extra = self.ann.ids[~np.isin(self.ann.ids, current)]
+                missing = current[~np.isin(current, self.ann.ids)]
+                if len(extra) or len(missing):
+                    self.ann.remove(extra)
+                    self.ann.add(missing, self.embedding_matrix[[self.matrix_rows[c] for c in missing.tolist()]])
+                    changed = True
+        elif updates or removed:
+            self.ann.remove(removed)
+            if updates:
+                self.ann.add(list(updates), np.vstack(list(updates.values())))
+            changed = True
+
+        if self.ann is None or self.ann.needs_retrain():
+            console.print(f"[dim]Training IVF index over {len(self.matrix_ids)} chunks...[/dim]")
+            self.ann = IVFIndex.train(self.matrix_ids, self.embedding_matrix)
+            recall = evaluate_recall(self.embedding_matrix, self.matrix_ids, self.ann, n_queries=50)
+            console.print(f"[dim]IVF index: {self.ann.nlist} lists, recall@5 ~ {recall:.2f} vs exact[/dim]")
+            changed = True
+
+        if changed:
+            self.ann.save(INDEX_PATH)
+
+    def ingest_vault(self, batch_size: int = None, parallel: int = None):
+        """
+        Full scan: re-chunk changed files and drop files deleted from the vault.
+        Only chunks whose content hash is new get embedded (in batches);
+        unchanged chunks keep their embedding and stale ones are deleted.
+        """
         console.print(f"[bold blue]Scanning vault at {VAULT_PATH}...[/bold blue]")
-        
-        changes_count = 0
-        
-        # 1. Walk through all Markdown files
+        self._ensure_local()
+
+        # Every stored mtime in one query instead of one lookup per file
+        cursor = self.conn.execute("SELECT filepath, modified_at FROM documents WHERE chunk_index = 0")
+        known_mtimes = {row["filepath"]: row["modified_at"] for row in cursor.fetchall()}
+
+        # 1. Walk through all Markdown files and collect the changed ones
+        pending = []  # (rel_path, content, mtime)
+        seen = set()
         for file_path in VAULT_PATH.rglob("*.md"):
             # Relative path for ID (e.g., "daily/2024-01-01.md")
             rel_path = str(file_path.relative_to(VAULT_PATH))
+            seen.add(rel_path)
+            entry = self._read_if_changed(file_path, rel_path, known_mtimes.get(rel_path))
+            if entry:
+                pending.append(entry)
+
+        deleted = [rel_path for rel_path in known_mtimes if rel_path not in seen]
+        self._ingest_files(pending, deleted, batch_size, parallel)
+
+    def ingest_paths(self, rel_paths, batch_size: int = None, parallel: int = None):
+        """Re-index only the given vault-relative paths (used by the watcher)."""
+        rel_paths = sorted(set(rel_paths))
+        if not rel_paths:
+            return
+        self._ensure_local()
+        placeholders = ",".join("?" * len(rel_paths))
+        cursor = self.conn.execute(
+            f"SELECT filepath, modified_at FROM documents WHERE chunk_index = 0 AND filepath IN ({placeholders})",
+            rel_paths
+        )
+        known_mtimes = {row["filepath"]: row["modified_at"] for row in cursor.fetchall()}
+
+        pending, deleted = [], []
+        for rel_path in rel_paths:
+            file_path = VAULT_PATH / rel_path
+            if file_path.is_file():
+                entry = self._read_if_changed(file_path, rel_path, known_mtimes.get(rel_path))
+                if entry:
+                    pending.append(entry)
+            elif rel_path in known_mtimes:
+                deleted.append(rel_path)
+        self._ingest_files(pending, deleted, batch_size, parallel)
+
+    def _read_if_changed(self, file_path, rel_path, known_mtime):
+        """(rel_path, content, mtime) if the file changed since it was stored, else None."""
+        try:
             mtime = file_path.stat().st_mtime
-            
-            # Check if file needs update
+            if known_mtime == mtime:
+                return None  # Skip if unchanged
+            content = file_path.read_text(encoding="utf-8")
+        except Exception as e:
+            console.print(f"[red]Error reading {rel_path}: {e}[/red]")
+            return None
+        if content.strip() or known_mtime is not None:
+            return (rel_path, content, mtime)
+        return None
+
+    def _ingest_files(self, pending, deleted=(), batch_size: int = None, parallel: int = None):
+        """Chunk, embed and write changed files; delete the chunks of removed files."""
+        batch_size = batch_size or EMBED_BATCH_SIZE
+        parallel = EMBED_PARALLEL if parallel is None else parallel
+
+        if not pending and not deleted:
+            console.print("[dim]No changes detected.[/dim]")
+            return
+
+        removed = set()
+        if deleted:
+            placeholders = ",".join("?" * len(deleted))
             cursor = self.conn.execute(
-                "SELECT modified_at FROM documents WHERE filepath = ?", (rel_path,)
+                f"SELECT id FROM documents WHERE filepath IN ({placeholders})", deleted
             )
-            row = cursor.fetchone()
-            
-            if row and row["modified_at"] == mtime:
-                continue  # Skip if unchanged
+            removed = {row["id"] for row in cursor.fetchall()}
+            with self.store.write() as conn:
+                conn.execute(f"DELETE FROM documents WHERE filepath IN ({placeholders})", deleted)
+            for rel_path in deleted:
+                console.print(f"Removed: [red]{rel_path}[/red]")
 
-            # 2. Read and Embed
-            try:
-                content = file_path.read_text(encoding="utf-8")
-                if not content.strip():
-                    continue
-
-                console.print(f"Ingesting: [green]{rel_path}[/green]")
-                
-                # fastembed returns a generator, get the first item
-                embedding_gen = self.embedding_model.embed([content])
-                embedding = list(embedding_gen)[0] # numpy array
-                
-                # Store as binary pickle
-                embedding_blob = pickle.dumps(embedding)
-
-                # 3. Upsert into DB
-                self.conn.execute(
+        if not pending:
+            with self.lock:
+                self._update_matrix({}, removed)
+                self._sync_ann({}, removed)
+                self._mark_synced()
+            return
+
+        # 2. Chunk each file and reuse stored embeddings for unchanged chunk text
+        now = time.time()
+        files = []     # (rel_path, rows, old_ids)
+        to_embed = []  # rows that still need an embedding
+        for rel_path, content, mtime in pending:
+            existing = self.conn.execute(
+                "SELECT id, content_hash, embedding FROM documents WHERE filepath = ?", (rel_path,)
+            ).fetchall()
+            known = {row["content_hash"]: row["embedding"] for row in existing if row["embedding"] is not None}
+
+            chunks = split_markdown(content)
+            doc_type = doc_type_for(rel_path)
+            doc_date = doc_date_for(rel_path, mtime)
+            rows = []
+            for chunk_index, chunk in enumerate(chunks):
+                chunk_hash = content_hash(chunk)
+                row = [rel_path, chunk_index, len(chunks), chunk, chunk_hash, mtime,
+                       known.get(chunk_hash), doc_type, estimate_tokens(chunk), now, doc_date,
+                       pack_spans(passage_spans(chunk))]
+                if row[6] is None:
+                    to_embed.append(row)
+                rows.append(row)
+            files.append((rel_path, rows, {row["id"] for row in existing}))
+
+        # 3. Embed only new chunk text in one streaming call; fastembed fans
+        # batches out to `parallel` worker processes (0 = all cores).
+        if to_embed:
+            console.print(f"Embedding [green]{len(to_embed)}[/green] new chunks (batch size {batch_size})...")
+            embeddings = self.embedding_model.embed(
+                [row[3] for row in to_embed],
+                batch_size=batch_size,
+                parallel=None if parallel == 1 else parallel
+            )
+            with Progress(console=console, transient=True) as progress:
+                task = progress.add_task("Embedding", total=len(to_embed))
+                for row, embedding in zip(to_embed, embeddings):
+                    # Store as raw little-endian floats (see memory/vectors.py)
+                    row[6] = encode_embedding(embedding, EMBEDDING_DTYPE)
+                    progress.advance(task)
+
+        # 4. Write file by file, committing roughly every batch_size chunks
+        batch = []
+        for file_entry in files:
+            batch.append(file_entry)
+            if sum(len(rows) for _, rows, _ in batch) >= batch_size:
+                self._write_chunks(batch)
+                batch = []
+        if batch:
+            self._write_chunks(batch)
+
+        # 5. Sync the in-memory matrix with what was written. Old daily logs
+        # stay out of it; their month partition rebuilds on its next search.
+        paths = [rel_path for rel_path, _, _ in files]
+        placeholders = ",".join("?" * len(paths))
+        cursor = self.conn.execute(
+            f"SELECT id, embedding, doc_type, doc_date FROM documents WHERE filepath IN ({placeholders})", paths
+        )
+        updates, days, written = {}, {}, set()
+        for row in cursor.fetchall():
+            written.add(row["id"])
+            if self._is_hot(row["doc_type"], row["doc_date"]):
+                updates[row["id"]] = decode_embedding(row["embedding"])
+                days[row["id"]] = day_number(row["doc_type"], row["doc_date"])
+        stale = set().union(*(old_ids for _, _, old_ids in files)) - written
+        removed |= stale | (written - set(updates))
+        with self.lock:
+            self._update_matrix(updates, removed, days)
+            self._sync_ann(updates, removed)
+            self._mark_synced()
+
+        total_chunks = sum(len(rows) for _, rows, _ in files)
+        console.print(
+            f"[bold green]Updated {len(files)} documents: {len(to_embed)} of {total_chunks} chunks embedded, "
+            f"{total_chunks - len(to_embed)} reused, {len(stale)} stale removed.[/bold green]"
+        )
+
+    def _write_chunks(self, files):
+        """Upsert the chunks of each file and delete its stale trailing chunks, in one short transaction."""
+        with self.store.write() as conn:
+            for rel_path, rows, _ in files:
+                conn.execute(
+                    "DELETE FROM documents WHERE filepath = ? AND chunk_index >= ?", (rel_path, len(rows))
+                )
+                conn.executemany(
                     """
-                    INSERT OR REPLACE INTO documents (filepath, content, modified_at, embedding)
-                    VALUES (?, ?, ?, ?)
+                    INSERT INTO documents
+                        (filepath, chunk_index, chunk_total, content, content_hash, modified_at,
+                         embedding, doc_type, token_count, ingested_at, doc_date, passages)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(filepath, chunk_index) DO UPDATE SET
+                        doc_date = excluded.doc_date,
+                        passages = excluded.passages,
+                        chunk_total = excluded.chunk_total,
+                        content = excluded.content,
+                        content_hash = excluded.content_hash,
+                        modified_at = excluded.modified_at,
+                        embedding = excluded.embedding,
+                        doc_type = excluded.doc_type,
+                        token_count = excluded.token_count,
+                        ingested_at = CASE
+                            WHEN documents.content_hash = excluded.content_hash THEN documents.ingested_at
+                            ELSE excluded.ingested_at
+                        END
                     """,
-                    (rel_path, content, mtime, embedding_blob)
+                    rows
                 )
-                changes_count += 1
-            except Exception as e:
-                console.print(f"[red]Error processing {rel_path}: {e}[/red]")
 
-        self.conn.commit()
-        
-        if changes_count > 0:
-            console.print(f"[bold green]Updated {changes_count} documents.[/bold green]")
-            self._refresh_bm25() # Rebuild BM25 index with new data
-        else:
-            console.print("[dim]No changes detected.[/dim]")
-
-    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, limit: int = 5, mode: str = None, nprobe: int = None,
+               doc_type=None, path_prefix: str = None, since=None, until=None,
+               archive: bool = None, recency_half_life: float = None,
+               snippet_chars: int = None) -> List[Dict[str, Any]]:
         """
-        Hybrid Search:
-        0.7 * Vector Similarity + 0.3 * BM25 Keyword Score
+        Hybrid Search over chunks:
+        (0.7 * Vector Similarity + 0.3 * BM25 Keyword Score (FTS5)) * recency factor
+        mode="exact" scores every hot chunk; mode="ann" only scores the IVF
+        candidates plus keyword matches (falls back to exact for small vaults).
+        Filters (doc_type, path_prefix, since/until as ISO dates) are applied
+        in SQL first, so only the matching chunks are scored.
+        Daily logs older than the hot months (cold partitions) are searched with
+        archive=True or when `since` reaches back into them; archive=False never
+        searches them. By default (None) they are searched only when fewer than
+        `limit` hot hits score ARCHIVE_MIN_SCORE, so old logs still surface when
+        nothing recent matches. Recency decay (half-life in days, 0 = off)
+        down-weights old daily logs; core documents never decay.
+        Each hit carries a "snippet": its best-matching passage within
+        snippet_chars (default MEMORY_SNIPPET_CHARS), for use in prompts.
         """
-        if not self.bm25:
-            console.print("[yellow]Warning: Database is empty.[/yellow]")
+        filters = {"doc_type": doc_type, "path_prefix": path_prefix,
+                   "since": str(since) if since else None, "until": str(until) if until else None}
+        if self.remote is not None:
+            try:
+                return self.remote.search(query, limit=limit, mode=mode, nprobe=nprobe, archive=archive,
+                                          recency_half_life=recency_half_life, snippet_chars=snippet_chars,
+                                          **filters)
+            except (OSError, ValueError, RuntimeError) as e:
+                console.print(f"[yellow]Memory daemon unavailable ({e}), searching in-process.[/yellow]")
+                self.remote = None
+        with self.lock:
+            # Pick up chunks written by the watcher or an ingest in another process,
+            # and move the hot cutoff at month rollover (a cheap data_version check)
+            self.refresh()
+            args = (query, limit, mode, nprobe, filters, recency_half_life, snippet_chars)
+            hits = self._search_local(*args, archive=bool(archive))
+            if archive is None and self._needs_archive(hits, limit, filters):
+                hits = self._search_local(*args, archive=True)
+            if not hits and self.embedding_matrix is None:
+                console.print("[yellow]Warning: Database is empty.[/yellow]")
+            return hits
+
+    def _needs_archive(self, hits, limit, filters):
+        """Default search: also scan the cold months if the hot ones gave too few good hits."""
+        since_date = (filters["since"] or "")[:10]
+        if since_date and since_date < self.hot_cutoff:
+            return False  # `since` already reached into them
+        if sum(1 for hit in hits if hit["score"] >= ARCHIVE_MIN_SCORE) >= limit:
+            return False
+        with self.store.read() as conn:
+            return bool(self.cold.months(conn, filters["since"], filters["until"]))
+
+    def _search_local(self, query, limit, mode, nprobe, filters, recency_half_life, snippet_chars, archive=False):
+        """search() against the in-process matrix, ANN index and cold partitions; call under self.lock."""
+        since_date, until_date = (filters["since"] or "")[:10], (filters["until"] or "")[:10]
+        scan_cold = archive or (since_date and since_date < self.hot_cutoff)
+        if self.embedding_matrix is None and not scan_cold:
             return []
+        mode = mode or SEARCH_MODE
+        half_life = RECENCY_HALF_LIFE_DAYS if recency_half_life is None else recency_half_life
+
+        # One read transaction on a pooled read-only connection: every query
+        # below sees the same snapshot, and writers in other processes never block it
+        with self.store.read() as conn:
+            # 0. Restrict to the filtered subset via indexed SQL predicates
+            where, params = self._filter_clause(**filters)
+            allowed = self._filtered_rows(where, params, conn) if where else None
+
+            # 1. Embed the query (FastEmbed vectors are normalized, so dot == cosine)
+            query_vec = self._embed_query(query, conn)
+
+            # 2. Get BM25 scores from SQLite as sorted (id, score) arrays
+            keyword_scores = self._keyword_scores(query, where, params, conn)
+            keyword_ids = np.fromiter(keyword_scores.keys(), dtype=np.int64, count=len(keyword_scores))
+            keyword_values = np.fromiter(keyword_scores.values(), dtype=np.float32, count=len(keyword_scores))
+            order = np.argsort(keyword_ids)
+            keyword_ids, keyword_values = keyword_ids[order], keyword_values[order]
+
+            def bm25_for(ids):
+                """Raw BM25 per chunk id; non-matching chunks score 0."""
+                if len(keyword_ids) == 0:
+                    return np.zeros(len(ids), dtype=np.float32)
+                pos = np.minimum(np.searchsorted(keyword_ids, ids), len(keyword_ids) - 1)
+                return np.where(keyword_ids[pos] == ids, keyword_values[pos], 0).astype(np.float32)
+
+            # 3. Vector scores over the hot matrix: all rows, the filtered ones or ANN candidates
+            use_ann = mode == "ann" and self.ann is not None and (allowed is None or len(allowed) > ANN_MIN_VECTORS)
+            if use_ann:
+                candidate_ids = set(self.ann.candidates(query_vec, nprobe).tolist()) | set(keyword_scores)
+                rows = np.fromiter(
+                    (self.matrix_rows[c] for c in candidate_ids if c in self.matrix_rows), dtype=np.int64
+                )
+                if allowed is not None:
+                    rows = np.intersect1d(rows, allowed, assume_unique=True)
+            else:
+                rows = allowed
+
+            if self.embedding_matrix is None:
+                part_ids, part_vec, part_days = [], [], []
+            elif rows is None:
+                part_ids, part_vec, part_days = [self.matrix_id_array], [self.embedding_matrix @ query_vec], [self.matrix_days]
+            else:
+                part_ids = [self.matrix_id_array[rows]]
+                part_vec = [self.embedding_matrix[rows] @ query_vec]
+                part_days = [self.matrix_days[rows]]
+
+            # 4. Cold months: memory-mapped partitions, only when the query reaches back that far
+            if scan_cold:
+                for month in self.cold.months(conn, since_date or None, until_date or None):
+                    ids, vectors, days = self.cold.load(conn, month)
+                    if len(ids) == 0:
+                        continue
+                    if where:
+                        cursor = conn.execute(
+                            f"SELECT d.id FROM documents d WHERE {where} AND d.doc_type = 'daily' "
+                            "AND d.doc_date >= ? AND d.doc_date < ?",
+                            (*params, f"{month}-01", f"{month}-32")
+                        )
+                        mask = np.isin(ids, np.fromiter((row[0] for row in cursor), dtype=np.int64))
+                        if not mask.any():
+                            continue
+                        ids, vectors, days = ids[mask], vectors[mask], days[mask]
+                    part_ids.append(ids)
+                    part_vec.append(vectors @ query_vec)
+                    part_days.append(days)
+
+            if not part_ids:
+                return []
+            candidate_ids = np.concatenate(part_ids)
+            if len(candidate_ids) == 0:
+                return []
+            vec_scores = np.concatenate(part_vec)
+
+            # Normalize BM25 scores (0 to 1) to match Vector Cosine range
+            bm25_scores = bm25_for(candidate_ids)
+            max_bm25 = bm25_scores.max()
+            if max_bm25 > 0:
+                bm25_scores = bm25_scores / max_bm25
 
-        # 1. Get Vector Scores
-        query_embedding = list(self.embedding_model.embed([query]))[0]
-        
-        cursor = self.conn.execute("SELECT filepath, content, embedding FROM documents")
-        rows = cursor.fetchall()
-        
-        results = []
-        
-        # 2. Calculate Scores
-        # Note: For massive DBs, do this in SQL (sqlite-vec) or vector DB. 
-        # For local usage (<10k files), Python loop is fast enough.
-        
-        # Get BM25 scores for all docs
-        tokenized_query = query.lower().split()
-        bm25_scores = self.bm25.get_scores(tokenized_query)
-        
-        # Normalize BM25 scores (0 to 1) to match Vector Cosine range
-        if max(bm25_scores) > 0:
-            bm25_scores = bm25_scores / max(bm25_scores)
-            
-        for idx, row in enumerate(rows):
-            # Deserialize vector
-            doc_vec = pickle.loads(row["embedding"])
-            
-            # Cosine Similarity (Dot product for normalized vectors)
-            # FastEmbed vectors are normalized by default
-            vec_score = np.dot(query_embedding, doc_vec)
-            
-            keyword_score = bm25_scores[idx]
-            
             # HYBRID WEIGHTING
-            final_score = (0.7 * vec_score) + (0.3 * keyword_score)
-            
-            results.append({
-                "filepath": row["filepath"],
-                "content": row["content"],
-                "score": final_score,
-                "type": "hybrid"
-            })
+            final_scores = (0.7 * vec_scores) + (0.3 * bm25_scores)
+            if half_life > 0:
+                today = int(np.datetime64(time.strftime("%Y-%m-%d"), "D").astype(np.int64))
+                final_scores = final_scores * recency_factor(np.concatenate(part_days), today, half_life, RECENCY_WEIGHT)
+
+            # 5. Top-k via argpartition, then sort only the k winners
+            k = min(limit, len(final_scores))
+            if k <= 0:
+                return []
+            top = np.argpartition(-final_scores, k - 1)[:k]
+            top = top[np.argsort(-final_scores[top])]
+
+            # 6. Fetch content for the winners only, cut to their best passage
+            ids = candidate_ids[top].tolist()
+            placeholders = ",".join("?" * len(ids))
+            cursor = conn.execute(
+                f"SELECT id, filepath, chunk_index, content, passages FROM documents WHERE id IN ({placeholders})", ids
+            )
+            chunks = {row["id"]: row for row in cursor.fetchall()}
+            terms = query_terms(query)
 
-        # 3. Sort and limit
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:limit]
+            return [
+                {
+                    "filepath": chunks[chunk_id]["filepath"],
+                    "chunk_index": chunks[chunk_id]["chunk_index"],
+                    "content": chunks[chunk_id]["content"],
+                    "snippet": best_snippet(
+                        chunks[chunk_id]["content"],
+                        unpack_spans(chunks[chunk_id]["passages"]) if chunks[chunk_id]["passages"] else None,
+                        terms, snippet_chars
+                    ),
+                    "score": float(final_scores[pos]),
+                    "type": "hybrid"
+                }
+                for chunk_id, pos in zip(ids, top)
+                if chunk_id in chunks
+            ]
 
 # --- CLI for Testing ---
 if __name__ == "__main__":
@@ -187,7 +766,7 @@ if __name__ == "__main__":
             table.add_column("Snippet", style="white")
 
             for hit in hits:
-                snippet = hit["content"][:100].replace("\n", " ") + "..."
+                snippet = hit["snippet"].replace("\n", " ")
                 table.add_row(f"{hit['score']:.4f}", hit["filepath"], snippet)
             
             console.print(table)
@@ -0,0 +1,290 @@
+import io
+import sys
+import time
+import pickle
+import sqlite3
+from pathlib import Path
+from rich.console import Console
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from memory.vectors import encode_embedding, is_raw_embedding
+from memory.chunking import content_hash, doc_type_for, estimate_tokens
+from memory.snippets import passage_spans, pack_spans
+
+console = Console()
+
+# Another process may be in the middle of a long step (re-chunking, re-embedding)
+MIGRATE_LOCK_TIMEOUT_MS = 600_000
+
+# Legacy pickles may only rebuild plain numpy arrays, nothing else.
+SAFE_PICKLE_GLOBALS = {
+    ("numpy", "ndarray"),
+    ("numpy", "dtype"),
+    ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "_reconstruct"),
+    ("numpy.core.multiarray", "scalar"),
+    ("numpy._core.multiarray", "scalar"),
+}
+
+
+class _NumpyOnlyUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) not in SAFE_PICKLE_GLOBALS:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name}")
+        return super().find_class(module, name)
+
+
+def _load_legacy_pickle(blob):
+    return _NumpyOnlyUnpickler(io.BytesIO(blob)).load()
+
+
+def _run_script(conn, script):
+    """Like executescript(), but statement by statement inside the open transaction."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+
+# --- Migration Steps ---
+# Each step upgrades the schema by exactly one version (PRAGMA user_version)
+# and runs in a single transaction, so an interrupted step leaves no trace.
+
+def _raw_embeddings(conn, dtype):
+    """v1: Convert pickled numpy embeddings into the raw float BLOB format."""
+    rows = conn.execute("SELECT rowid, filepath, embedding FROM documents").fetchall()
+    converted = 0
+    for rowid, filepath, blob in rows:
+        if blob is None or is_raw_embedding(blob):
+            continue
+        try:
+            vector = _load_legacy_pickle(blob)
+        except Exception as e:
+            console.print(f"[red]Dropping unreadable embedding for {filepath}: {e}[/red]")
+            # Force re-ingestion of this file on the next scan
+            conn.execute("UPDATE documents SET embedding = NULL, modified_at = 0 WHERE rowid = ?", (rowid,))
+            continue
+        conn.execute(
+            "UPDATE documents SET embedding = ? WHERE rowid = ?",
+            (encode_embedding(vector, dtype), rowid)
+        )
+        converted += 1
+    console.print(f"[dim]Converted {converted} pickled embeddings to raw {dtype}.[/dim]")
+
+
+def _create_fts(conn, rowid_column):
+    _run_script(conn, f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            content,
+            content='documents',
+            content_rowid='{rowid_column}',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+            INSERT INTO documents_fts(rowid, content) VALUES (new.{rowid_column}, new.content);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, content) VALUES ('delete', old.{rowid_column}, old.content);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS documents_fts_update AFTER UPDATE OF content ON documents
+        WHEN old.content IS NOT new.content BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, content) VALUES ('delete', old.{rowid_column}, old.content);
+            INSERT INTO documents_fts(rowid, content) VALUES (new.{rowid_column}, new.content);
+        END;
+    """)
+    # One-off indexing of the existing rows
+    conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+
+def _drop_fts(conn):
+    _run_script(conn, """
+        DROP TRIGGER IF EXISTS documents_fts_insert;
+        DROP TRIGGER IF EXISTS documents_fts_delete;
+        DROP TRIGGER IF EXISTS documents_fts_update;
+        DROP TABLE IF EXISTS documents_fts;
+    """)
+
+
+def _fts_index(conn, dtype):
+    """v2: Add the FTS5 keyword index over documents.content, kept in sync by triggers."""
+    _create_fts(conn, "rowid")
+
+
+def _chunked_documents(conn, dtype):
+    """v3: Switch to one row per chunk with content hashes and metadata."""
+    _drop_fts(conn)
+    _run_script(conn, """
+        CREATE TABLE documents_chunked (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filepath TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            chunk_total INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            modified_at REAL NOT NULL,
+            embedding BLOB,
+            doc_type TEXT NOT NULL,
+            token_count INTEGER,
+            ingested_at REAL NOT NULL,
+            UNIQUE(filepath, chunk_index)
+        );
+    """)
+
+    # Whole files become chunk 0 of 1. modified_at = 0 forces a re-chunk on the
+    # next ingest; chunks whose text is unchanged keep their embedding by hash.
+    now = time.time()
+    rows = conn.execute("SELECT filepath, content, embedding FROM documents").fetchall()
+    conn.executemany(
+        """
+        INSERT INTO documents_chunked
+            (filepath, chunk_index, chunk_total, content, content_hash, modified_at,
+             embedding, doc_type, token_count, ingested_at)
+        VALUES (?, 0, 1, ?, ?, 0, ?, ?, ?, ?)
+        """,
+        [
+            (filepath, content or "", content_hash(content or ""), embedding,
+             doc_type_for(filepath), estimate_tokens(content or ""), now)
+            for filepath, content, embedding in rows
+        ]
+    )
+
+    _run_script(conn, """
+        DROP TABLE documents;
+        ALTER TABLE documents_chunked RENAME TO documents;
+        CREATE INDEX IF NOT EXISTS idx_doc_type ON documents(doc_type);
+        CREATE INDEX IF NOT EXISTS idx_modified ON documents(modified_at);
+    """)
+    _create_fts(conn, "id")
+
+
+def _query_cache(conn, dtype):
+    """v4: Add the LRU cache of query embeddings shared by all modes."""
+    _run_script(conn, """
+        CREATE TABLE IF NOT EXISTS query_cache (
+            model TEXT NOT NULL,
+            query TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (model, query)
+        );
+        CREATE INDEX IF NOT EXISTS idx_query_cache_last_used ON query_cache(last_used);
+    """)
+
+
+def _doc_date(conn, dtype):
+    """v5: Add an indexed doc_date column for date-range filtered search."""
+    _run_script(conn, """
+        ALTER TABLE documents ADD COLUMN doc_date TEXT;
+        UPDATE documents SET doc_date = CASE
+            WHEN filepath GLOB 'daily/[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9].md' THEN substr(filepath, 7, 10)
+            ELSE date(modified_at, 'unixepoch', 'localtime')
+        END;
+        CREATE INDEX IF NOT EXISTS idx_doc_date ON documents(doc_date);
+        CREATE INDEX IF NOT EXISTS idx_doc_type_date ON documents(doc_type, doc_date);
+    """)
+
+
+def _passages(conn, dtype):
+    """v6: Store passage offsets per chunk for query-focused snippets."""
+    conn.execute("ALTER TABLE documents ADD COLUMN passages BLOB")
+    rows = conn.execute("SELECT id, content FROM documents").fetchall()
+    conn.executemany(
+        "UPDATE documents SET passages = ? WHERE id = ?",
+        [(pack_spans(passage_spans(content)), chunk_id) for chunk_id, content in rows]
+    )
+
+
+MIGRATIONS = [_raw_embeddings, _fts_index, _chunked_documents, _query_cache, _doc_date, _passages]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def backup_db(conn):
+    """
+    Copy the database next to itself as db.sqlite.backup-<timestamp>.
+    Reads through its own connection, so it also works while `conn` holds
+    the write lock (a connection cannot back up its own open write transaction).
+    """
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not db_file:
+        return None  # In-memory database
+    backup_path = Path(f"{db_file}.backup-{time.strftime('%Y%m%d-%H%M%S')}")
+    source = sqlite3.connect(db_file)
+    target = sqlite3.connect(backup_path)
+    with target:
+        source.backup(target)
+    target.close()
+    source.close()
+    return backup_path
+
+
+def migrate(conn, dtype="float32", backup=True):
+    """
+    Bring the documents table up to SCHEMA_VERSION. Safe to call repeatedly,
+    and from several processes at once: every step takes the write lock
+    (BEGIN IMMEDIATE) and re-reads user_version under it, so a step that
+    another process already applied is skipped instead of run twice.
+    """
+    if get_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION  # Fast path, no lock
+
+    # Manage transactions explicitly so schema changes (DDL) are atomic too
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+    conn.execute(f"PRAGMA busy_timeout = {MIGRATE_LOCK_TIMEOUT_MS}")
+    backed_up = not backup
+    try:
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = get_version(conn)
+                if version >= SCHEMA_VERSION:
+                    conn.execute("COMMIT")
+                    break
+                if not backed_up:
+                    # Decided under the lock: only the process that actually migrates backs up
+                    backed_up = True
+                    if conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone() is not None:
+                        backup_path = backup_db(conn)
+                        if backup_path:
+                            console.print(f"[dim]Backed up memory database to {backup_path}[/dim]")
+                step = MIGRATIONS[version]
+                console.print(f"[bold blue]Migrating memory schema -> {step.__doc__}[/bold blue]")
+                step(conn, dtype)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+        conn.isolation_level = isolation_level
+
+    return SCHEMA_VERSION
+
+
+# --- CLI ---
+if __name__ == "__main__":
+    from memory.ingest import DB_PATH, EMBEDDING_DTYPE
+    from memory.store import connect
+
+    conn = connect(DB_PATH)
+    before = get_version(conn)
+    after = migrate(conn, dtype=EMBEDDING_DTYPE)
+    if after == before:
+        console.print(f"[dim]Memory database already at schema v{after}.[/dim]")
+    else:
+        console.print(f"[bold green]Migrated memory database v{before} -> v{after}.[/bold green]")
+    conn.close()
@@ -0,0 +1,140 @@
+import os
+import json
+import fcntl
+import numpy as np
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+from memory.ann import INDEX_PATH
+from memory.vectors import decode_embedding
+
+# --- Configuration ---
+HOT_MONTHS = int(os.getenv("MEMORY_HOT_MONTHS", 3))  # Daily-log months kept in the in-memory matrix
+PARTITIONS_PATH = INDEX_PATH / "partitions"
+NO_DATE = -1  # Day number used for chunks that never decay (SYSTEM.md, SOUL.md, ...)
+
+
+def hot_cutoff(today: date = None) -> str:
+    """First day (ISO) of the oldest hot month; daily logs before it are cold."""
+    today = today or date.today()
+    month_index = today.year * 12 + today.month - 1 - (HOT_MONTHS - 1)
+    return date(month_index // 12, month_index % 12 + 1, 1).isoformat()
+
+
+def day_number(doc_type: str, doc_date: str) -> int:
+    """Days since the epoch for daily logs (used for recency decay), NO_DATE otherwise."""
+    if doc_type != "daily" or not doc_date:
+        return NO_DATE
+    return int(np.datetime64(doc_date, "D").astype(np.int64))
+
+
+def recency_factor(days, today_day, half_life, weight):
+    """
+    Multiplicative decay: 1 - weight + weight * 0.5 ** (age / half_life).
+    Undated chunks (NO_DATE) keep factor 1.
+    """
+    age = np.maximum(today_day - days, 0)
+    decay = 1.0 - weight + weight * np.power(0.5, age / half_life)
+    return np.where(days == NO_DATE, 1.0, decay).astype(np.float32)
+
+
+@contextmanager
+def _month_lock(path: Path):
+    """Exclusive flock on <path>.lock, held across processes for the duration of the block."""
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ColdPartitions:
+    """
+    Month partitions of old daily-log chunks, persisted as .npy files under
+    memory/index/partitions/ and memory-mapped on demand. Each partition is
+    rebuilt from SQLite only when its rows changed (count/max id/ingest time).
+    A month's files are checked, rebuilt and opened under one flock, so
+    processes never build it concurrently or read a half-replaced set.
+    """
+
+    def __init__(self, path=PARTITIONS_PATH):
+        self.path = Path(path)
+        self._loaded = {}  # month -> (signature, ids, vectors, days)
+
+    def months(self, conn, since: str = None, until: str = None):
+        """Cold months (YYYY-MM) with daily chunks dated in [since, until], newest first."""
+        cursor = conn.execute(
+            """
+            SELECT DISTINCT substr(doc_date, 1, 7) FROM documents
+            WHERE doc_type = 'daily' AND doc_date >= ? AND doc_date <= ? AND doc_date < ?
+            ORDER BY 1 DESC
+            """,
+            (since or "0000-00-00", until or "9999-12-31", hot_cutoff())
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _signature(self, conn, month):
+        row = conn.execute(
+            """
+            SELECT count(*), max(id), max(ingested_at) FROM documents
+            WHERE doc_type = 'daily' AND doc_date >= ? AND doc_date < ?
+            """,
+            (f"{month}-01", f"{month}-32")
+        ).fetchone()
+        return [row[0], row[1], row[2]]
+
+    def _files(self, month):
+        return {name: self.path / f"{month}.{name}.npy" for name in ("ids", "vectors", "days")}
+
+    def _build(self, conn, month, signature):
+        """Write the month's arrays and signature; call under the month's lock."""
+        rows = conn.execute(
+            """
+            SELECT id, embedding, doc_date FROM documents
+            WHERE doc_type = 'daily' AND doc_date >= ? AND doc_date < ? AND embedding IS NOT NULL
+            ORDER BY id
+            """,
+            (f"{month}-01", f"{month}-32")
+        ).fetchall()
+        arrays = {
+            "ids": np.asarray([row[0] for row in rows], dtype=np.int64),
+            "vectors": np.vstack([decode_embedding(row[1]) for row in rows]).astype(np.float32)
+                       if rows else np.zeros((0, 0), dtype=np.float32),
+            "days": np.asarray([day_number("daily", row[2]) for row in rows], dtype=np.int32),
+        }
+        self.path.mkdir(parents=True, exist_ok=True)
+        for name, target in self._files(month).items():
+            tmp_path = target.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, arrays[name])
+            os.replace(tmp_path, target)
+        meta_tmp = self.path / f"{month}.json.tmp"
+        meta_tmp.write_text(json.dumps({"signature": signature}))
+        os.replace(meta_tmp, self.path / f"{month}.json")
+
+    def load(self, conn, month):
+        """(ids, vectors, days) for a cold month; vectors are memory-mapped."""
+        signature = self._signature(conn, month)
+        cached = self._loaded.get(month)
+        if cached and cached[0] == signature:
+            return cached[1:]
+
+        meta_path = self.path / f"{month}.json"
+        # A mapping stays valid after a later rebuild replaces the file
+        self.path.mkdir(parents=True, exist_ok=True)
+        with _month_lock(self.path / month):
+            try:
+                stored = json.loads(meta_path.read_text())["signature"]
+            except Exception:
+                stored = None
+            if stored != signature:
+                self._build(conn, month, signature)
+
+            files = self._files(month)
+            ids = np.load(files["ids"])
+            vectors = np.load(files["vectors"], mmap_mode="r")
+            days = np.load(files["days"])
+        self._loaded[month] = (signature, ids, vectors, days)
+        return ids, vectors, days
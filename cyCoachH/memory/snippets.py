@@ -0,0 +1,95 @@
+import os
+import re
+import math
+import unicodedata
+import numpy as np
+from typing import List, Tuple
+
+# --- Configuration ---
+SNIPPET_CHARS = int(os.getenv("MEMORY_SNIPPET_CHARS", 300))  # Budget per hit sent to the LLM
+
+# Passage boundaries: blank lines, line breaks before headings/list items, sentence ends
+PASSAGE_BREAK_RE = re.compile(r"\n\s*\n|\n(?=\s*(?:#|[-*] |\d+\. |\*\*))|(?<=[^\d\s][.!?])\s+")
+WORD_RE = re.compile(r"\w+")
+
+
+def passage_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) character offsets of the paragraphs and sentences in a chunk."""
+    spans, start = [], 0
+    for match in PASSAGE_BREAK_RE.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+
+    trimmed = []
+    for start, end in spans:
+        segment = text[start:end]
+        if not segment.strip():
+            continue
+        start += len(segment) - len(segment.lstrip())
+        end -= len(segment) - len(segment.rstrip())
+        trimmed.append((start, end))
+    return trimmed
+
+
+def pack_spans(spans) -> bytes:
+    """Store spans as raw little-endian uint32 pairs (documents.passages)."""
+    return np.asarray(spans, dtype="<u4").reshape(-1).tobytes()
+
+
+def unpack_spans(blob) -> List[Tuple[int, int]]:
+    flat = np.frombuffer(blob, dtype="<u4")
+    return [(int(flat[i]), int(flat[i + 1])) for i in range(0, len(flat), 2)]
+
+
+def _terms(text: str) -> List[str]:
+    """Lower-cased words without diacritics, like the FTS5 tokenizer (remove_diacritics 2)."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return WORD_RE.findall(folded)
+
+
+def query_terms(query: str) -> List[str]:
+    return list(dict.fromkeys(_terms(query)))
+
+
+def best_snippet(content: str, spans, terms, budget: int = None) -> str:
+    """
+    The passage sharing the most (rarest) query terms, widened with its
+    neighbours while it fits the character budget. Without any match the
+    snippet starts at the top of the chunk.
+    """
+    budget = budget or SNIPPET_CHARS
+    if len(content) <= budget:
+        return content.strip()
+    spans = spans or passage_spans(content)
+    if not spans:
+        return ""
+
+    # Score passages by matched query terms, weighted by rarity within the chunk
+    passage_terms = [set(_terms(content[start:end])) for start, end in spans]
+    weights = {}
+    for term in terms:
+        df = sum(term in words for words in passage_terms)
+        if df:
+            weights[term] = math.log(1 + len(spans) / df)
+    scores = [sum(weight for term, weight in weights.items() if term in words) for words in passage_terms]
+    best = max(range(len(spans)), key=lambda i: (scores[i], -i))
+
+    # Widen alternately forwards and backwards while the window fits
+    first = last = best
+    grown = True
+    while grown:
+        grown = False
+        if last + 1 < len(spans) and spans[last + 1][1] - spans[first][0] <= budget:
+            last += 1
+            grown = True
+        if first > 0 and spans[last][1] - spans[first - 1][0] <= budget:
+            first -= 1
+            grown = True
+
+    snippet = content[spans[first][0]:spans[last][1]]
+    if len(snippet) > budget:
+        cut = snippet.rfind(" ", 0, budget)
+        snippet = snippet[:cut if cut > 0 else budget].rstrip() + "…"
+    return snippet
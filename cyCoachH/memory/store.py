@@ -0,0 +1,100 @@
+import os
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+# --- Configuration ---
+BUSY_TIMEOUT_MS = int(os.getenv("MEMORY_BUSY_TIMEOUT_MS", 5000))  # Wait this long for a lock before failing
+READ_POOL_SIZE = int(os.getenv("MEMORY_READ_POOL_SIZE", 4))
+
+# Every process (chat, mattermost, heartbeat, watch, memoryd) opens the same
+# memory/db.sqlite. In WAL mode readers never block the writer or each other,
+# and each read transaction sees one consistent snapshot.
+
+
+def connect(path, readonly: bool = False) -> sqlite3.Connection:
+    """Open the memory database with WAL, a busy timeout and Row results."""
+    if readonly:
+        conn = sqlite3.connect(
+            f"{Path(path).resolve().as_uri()}?mode=ro", uri=True,
+            timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False
+        )
+    else:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")  # Persistent; a no-op once set
+        conn.execute("PRAGMA synchronous = NORMAL")  # Safe with WAL, fewer fsyncs
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class MemoryStore:
+    """
+    One writer connection, serialized by a lock, plus a pool of read-only
+    connections. write() runs a BEGIN IMMEDIATE transaction; read() hands out
+    a pooled connection inside a read transaction (one snapshot).
+    """
+
+    def __init__(self, path, pool_size: int = READ_POOL_SIZE):
+        self.path = Path(path)
+        self.writer = connect(self.path)
+        self.write_lock = threading.Lock()
+        self.pool_size = max(1, pool_size)
+        self._pool = queue.LifoQueue()
+        self._opened = 0
+        self._opened_lock = threading.Lock()
+
+    @contextmanager
+    def write(self, blocking: bool = True):
+        """
+        Transaction on the single writer connection. With blocking=False a
+        lock held by another process raises sqlite3.OperationalError at once
+        instead of waiting for the busy timeout (for best-effort writes).
+        """
+        with self.write_lock:
+            conn = self.writer
+            if not blocking:
+                conn.execute("PRAGMA busy_timeout = 0")
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+            finally:
+                if not blocking:
+                    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._opened_lock:
+            if self._opened < self.pool_size:
+                self._opened += 1
+                return connect(self.path, readonly=True)
+        return self._pool.get()
+
+    @contextmanager
+    def read(self):
+        """Pooled read-only connection; all queries inside see the same snapshot."""
+        conn = self._acquire()
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        finally:
+            conn.rollback()
+            self._pool.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self.writer.close()
@@ -0,0 +1,39 @@
+import struct
+import numpy as np
+
+# --- Embedding BLOB Format ---
+# 8-byte header followed by raw little-endian values:
+#   magic (3s) | format version (B) | dtype code (B) | pad (x) | dimension (H)
+# The payload can be read back without copying via np.frombuffer.
+MAGIC = b"CYE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<3sBBxH")
+
+DTYPE_CODES = {"float32": 0, "float16": 1}
+CODE_DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<f2")}
+
+
+def encode_embedding(vector, dtype: str = "float32") -> bytes:
+    """Serialize a 1-D vector into the versioned raw BLOB format."""
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+    code = DTYPE_CODES[dtype]
+    values = np.asarray(vector).astype(CODE_DTYPES[code], copy=False).ravel()
+    return HEADER.pack(MAGIC, FORMAT_VERSION, code, values.size) + values.tobytes()
+
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    """Return a read-only, zero-copy view over a raw embedding BLOB."""
+    magic, version, code, dim = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a raw embedding BLOB (legacy pickle? run memory/migrate.py)")
+    if version != FORMAT_VERSION or code not in CODE_DTYPES:
+        raise ValueError(f"Unsupported embedding format v{version} (dtype code {code})")
+
+    return np.frombuffer(blob, dtype=CODE_DTYPES[code], count=dim, offset=HEADER.size)
+
+
+def is_raw_embedding(blob: bytes) -> bool:
+    """True if the BLOB is already in the raw format."""
+    return blob is not None and bytes(blob[:len(MAGIC)]) == MAGIC
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+from rich.console import Console
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from memory.ingest import MemorySystem, VAULT_PATH
+
+# --- Configuration ---
+DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE", 2.0))  # Quiet period before reindexing
+MAX_DELAY_SECONDS = 30.0  # Flush even if events keep arriving (e.g. bulk copies)
+console = Console()
+
+
+class VaultEventHandler(FileSystemEventHandler):
+    """Collects vault-relative paths of changed Markdown files (inotify on Linux)."""
+
+    def __init__(self, vault_path):
+        self.vault_path = Path(vault_path).resolve()
+        self.lock = threading.Lock()
+        self.dirty = set()
+        self.first_event_at = None
+        self.last_event_at = None
+
+    def _mark(self, path):
+        path = Path(os.fsdecode(path))
+        if path.suffix != ".md":
+            return
+        try:
+            rel_path = str(path.resolve().relative_to(self.vault_path))
+        except ValueError:
+            return  # Moved out of (or never in) the vault
+        with self.lock:
+            now = time.monotonic()
+            self.dirty.add(rel_path)
+            self.first_event_at = self.first_event_at or now
+            self.last_event_at = now
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ("created", "modified", "deleted", "moved", "closed"):
+            return
+        self._mark(event.src_path)
+        if event.event_type == "moved":
+            self._mark(event.dest_path)
+
+    def take_ready(self):
+        """Return and clear the pending paths once the debounce window has passed."""
+        with self.lock:
+            if not self.dirty:
+                return []
+            now = time.monotonic()
+            quiet = now - self.last_event_at >= DEBOUNCE_SECONDS
+            overdue = now - self.first_event_at >= MAX_DELAY_SECONDS
+            if not (quiet or overdue):
+                return []
+            ready, self.dirty = self.dirty, set()
+            self.first_event_at = self.last_event_at = None
+            return sorted(ready)
+
+
+def watch_vault(mem: MemorySystem = None):
+    """Long-running ingestion daemon: full scan once, then reindex on file events."""
+    mem = mem or MemorySystem(use_daemon=False)
+    mem.ingest_vault()
+
+    handler = VaultEventHandler(VAULT_PATH)
+    observer = Observer()
+    observer.schedule(handler, str(VAULT_PATH), recursive=True)
+    observer.start()
+    console.print(f"[bold green]Watching {VAULT_PATH} (debounce {DEBOUNCE_SECONDS:.1f}s)...[/bold green]")
+
+    try:
+        while observer.is_alive():
+            time.sleep(0.25)
+            ready = handler.take_ready()
+            if not ready:
+                continue
+            console.print(f"[dim]Reindexing {len(ready)} changed file(s)...[/dim]")
+            try:
+                mem.ingest_paths(ready)
+            except Exception as e:
+                console.print(f"[red]Watch reindex failed: {e}[/red]")
+    finally:
+        observer.stop()
+        observer.join()
+
+
+if __name__ == "__main__":
+    try:
+        watch_vault()
+    except KeyboardInterrupt:
+        print("\nExiting.")
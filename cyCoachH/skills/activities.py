@@ -0,0 +1,163 @@
+import sys
+import json
+import time
+from pathlib import Path
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from memory.store import connect
+
+# --- Configuration ---
+ACTIVITY_DB = PROJECT_ROOT / "memory" / "activities.sqlite"
+
+# Columns copied out of the Strava payload for indexed/cheap access; the full
+# JSON stays in `raw`.
+COLUMNS = [
+    "start_date", "start_date_local", "sport_type", "name", "moving_time", "elapsed_time",
+    "distance", "total_elevation_gain", "average_speed", "average_heartrate", "max_heartrate",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,          -- Strava activity id
+    start_date TEXT NOT NULL,        -- UTC, ISO 8601
+    start_date_local TEXT NOT NULL,  -- Local time, ISO 8601 (Strava appends a misleading Z)
+    sport_type TEXT,
+    name TEXT,
+    moving_time REAL,
+    elapsed_time REAL,
+    distance REAL,
+    total_elevation_gain REAL,
+    average_speed REAL,
+    average_heartrate REAL,
+    max_heartrate REAL,
+    raw TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_activities_start ON activities(start_date);
+CREATE INDEX IF NOT EXISTS idx_activities_start_local ON activities(start_date_local);
+CREATE TABLE IF NOT EXISTS activity_metrics (
+    id INTEGER PRIMARY KEY,          -- Strava activity id (activities.id)
+    samples INTEGER NOT NULL,        -- 0 = no streams available (manual entry etc.)
+    trimp REAL,
+    hrtss REAL,
+    elevation_load REAL,
+    zone_seconds TEXT,               -- JSON list, seconds in HR zones 1-5
+    computed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+def open_store(path=ACTIVITY_DB):
+    """
+    Open (and create) the activity store. An empty store is filled by the
+    first sync with the whole Strava history, which supersedes the old
+    60-day endurain_cache.json.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_state(conn, key, default=None):
+    row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_state(conn, key, value):
+    conn.execute(
+        "INSERT INTO sync_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value)
+    )
+
+
+def upsert_activities(conn, activities):
+    """
+    Insert new activities and update edited ones (by Strava id).
+    Returns the earliest local date (YYYY-MM-DD) whose data changed, or None.
+    Call inside a transaction.
+    """
+    now = time.time()
+    earliest = None
+    for act in activities:
+        if "id" not in act or not act.get("start_date_local"):
+            continue
+        raw = json.dumps(act, sort_keys=True)
+        values = [act.get(column) for column in COLUMNS]
+        cursor = conn.execute(
+            f"""
+            INSERT INTO activities (id, {", ".join(COLUMNS)}, raw, updated_at)
+            VALUES (?, {", ".join("?" * len(COLUMNS))}, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                {", ".join(f"{column} = excluded.{column}" for column in COLUMNS)},
+                raw = excluded.raw,
+                updated_at = excluded.updated_at
+            WHERE activities.raw IS NOT excluded.raw
+            """,
+            (act["id"], *values, raw, now)
+        )
+        if cursor.rowcount:
+            day = act["start_date_local"][:10]
+            earliest = day if earliest is None else min(earliest, day)
+    return earliest
+
+
+def newest_start(conn):
+    """UTC start (ISO) of the most recent stored activity, or None."""
+    return conn.execute("SELECT max(start_date) FROM activities").fetchone()[0]
+
+
+def count_activities(conn):
+    return conn.execute("SELECT count(*) FROM activities").fetchone()[0]
+
+
+def save_metrics(conn, activity_id, metrics):
+    """Store stream-derived metrics (see skills/streams.py). Call inside a transaction."""
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO activity_metrics
+            (id, samples, trimp, hrtss, elevation_load, zone_seconds, computed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (activity_id, metrics.get("samples", 0), metrics.get("trimp"), metrics.get("hrtss"),
+         metrics.get("elevation_load"), json.dumps(metrics.get("zone_seconds")), time.time())
+    )
+
+
+def activities_without_metrics(conn, limit):
+    """Newest activities whose streams have not been processed yet."""
+    cursor = conn.execute(
+        """
+        SELECT a.id, a.start_date_local FROM activities a
+        LEFT JOIN activity_metrics m ON m.id = a.id
+        WHERE m.id IS NULL AND a.moving_time > 0
+        ORDER BY a.start_date DESC LIMIT ?
+        """,
+        (limit,)
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def activities_between(conn, since=None, until=None):
+    """
+    Activities with a local start date in [since, until] (ISO dates), oldest
+    first, with their stream metrics (hrtss, trimp, ...) when computed.
+    """
+    cursor = conn.execute(
+        f"""
+        SELECT a.id, {", ".join(f"a.{column}" for column in COLUMNS)},
+               m.trimp, m.hrtss, m.elevation_load, m.zone_seconds
+        FROM activities a LEFT JOIN activity_metrics m ON m.id = a.id
+        WHERE a.start_date_local >= ? AND a.start_date_local < ?
+        ORDER BY a.start_date_local
+        """,
+        (since or "0000", f"{until}~" if until else "9999")
+    )
+    return [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,60 @@
+import os
+import asyncio
+import aiohttp
+
+# One connection-pooled aiohttp session per event loop, shared by the async
+# code paths (Mattermost REST, OpenWeather, Strava): connections are kept
+# alive between requests and capped in total and per host.
+
+# --- Configuration ---
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10))                  # Whole request, seconds
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))   # Connection setup, seconds
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 32))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", 8))
+KEEPALIVE_SECONDS = 30  # Idle connections are closed after this
+
+# What a failed request raises (network errors and timeouts)
+HTTP_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+_sessions = {}  # event loop -> ClientSession
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Pooled session of the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_MAX_CONNECTIONS,
+            limit_per_host=HTTP_MAX_PER_HOST,
+            keepalive_timeout=KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        _sessions[loop] = session
+    return session
+
+
+def request_timeout(seconds):
+    """Per-request timeout (aiohttp wants a ClientTimeout, not a number)."""
+    return aiohttp.ClientTimeout(total=seconds, connect=min(seconds, HTTP_CONNECT_TIMEOUT))
+
+
+async def close_session():
+    """Close the running loop's session (call once before the loop ends)."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+def run_async(coro):
+    """asyncio.run() for the CLIs: run one coroutine, then close the session it used."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_session()
+    return asyncio.run(main())
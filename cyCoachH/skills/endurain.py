@@ -1,51 +1,209 @@
+import os
 import sys
-import json
 import time
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import datetime
 from pathlib import Path
 
 # --- Path Setup ---
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.append(str(PROJECT_ROOT))
-CACHE_FILE = PROJECT_ROOT / "memory" / "endurain_cache.json"
+FITNESS_FILE = PROJECT_ROOT / "memory" / "endurain_fitness.npz"  # Persisted daily load/CTL/ATL series
+
+# --- Activity Sync ---
+SYNC_INTERVAL = int(os.getenv("ACTIVITY_SYNC_INTERVAL", 1800))  # Seconds between Strava syncs
+EDIT_LOOKBACK = 3 * 86400  # Refetch the newest days too, to pick up edited activities
+
+# --- Fitness Model ---
+CTL_DAYS = 42     # Time constant of fitness (chronic training load)
+ATL_DAYS = 7      # Time constant of fatigue (acute training load)
+EWMA_BLOCK = 64   # Days per vectorized block (keeps a**-i well inside float64 range)
 
 try:
-    from skills.strava import get_raw_activities
+    from skills.strava import fetch_activities
+    from skills.state import locked_async
+    from skills.async_http import run_async
+    from skills.streams import STREAMS_ENABLED, sync_streams
+    from skills.activities import (
+        open_store, get_state, set_state, upsert_activities, newest_start, count_activities, activities_between
+    )
 except ImportError:
     print("Error: Could not import skills.strava")
     raise
 
-def load_cache():
-    if CACHE_FILE.exists():
-        try:
-            return json.loads(CACHE_FILE.read_text())
-        except:
-            pass
-    return {"last_fetch": 0, "activities": []}
+def _epoch(iso_utc):
+    return datetime.fromisoformat(iso_utc.replace("Z", "+00:00")).timestamp()
+
+def _sync_after(conn, force, now):
+    """Start (epoch) of the next incremental fetch, or None if the last sync is recent."""
+    if not force and now - (get_state(conn, "last_sync") or 0) < SYNC_INTERVAL:
+        return None
+    newest = newest_start(conn)
+    return _epoch(newest) - EDIT_LOOKBACK if newest else 0  # Empty store: whole history
 
-def save_cache(data):
-    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    CACHE_FILE.write_text(json.dumps(data))
+def _store_fetch(conn, result, now):
+    with conn:
+        changed = upsert_activities(conn, result.activities)
+        # A partial fetch is a gap-free prefix (oldest first): keep it and
+        # resume from the new newest activity on the next call
+        if result.complete or not result.activities:
+            set_state(conn, "last_sync", now)
+    if not result.complete:
+        print(f"Endurain: Strava sync incomplete, {len(result.activities)} activities stored ({result.error})")
+    return changed
 
-def get_activities_smart():
-    """Fetches activities with caching strategy."""
-    cache = load_cache()
+async def sync_activities(conn, force=False):
+    """
+    Incremental Strava sync into the activity store (memory/activities.sqlite).
+    Only activities starting after the newest stored one (minus EDIT_LOOKBACK)
+    are fetched and upserted by id. Returns the earliest changed local date or None.
+    """
     now = time.time()
-    
-    # Refresh if cache is older than 6 hours
-    is_stale = (now - cache["last_fetch"]) > 21600
-    is_empty = len(cache.get("activities", [])) == 0
-
-    if is_stale or is_empty:
-        fresh_data = get_raw_activities(days=60)
-        if fresh_data is not None:
-            cache = {
-                "last_fetch": now,
-                "activities": fresh_data
-            }
-            save_cache(cache)
-    
-    return cache["activities"]
+    after = _sync_after(conn, force, now)
+    if after is None:
+        return None
+    return _store_fetch(conn, await fetch_activities(after=after), now)
+
+def activity_load(act):
+    """
+    Training load of one activity: hrTSS from its heart-rate stream, else
+    elevation-adjusted moving minutes, else plain moving minutes
+    (see skills/streams.py; streams are optional).
+    """
+    if act.get("hrtss") is not None:
+        return act["hrtss"]
+    if act.get("elevation_load") is not None:
+        return act["elevation_load"]
+    return (act.get("moving_time") or 0) / 60 * 1.0
+
+def daily_load_array(activities):
+    """
+    Dense daily load array from an activity list: (first day as datetime64[D], loads).
+    Dates are sliced from the ISO strings and converted in one NumPy call.
+    """
+    dated = [act for act in activities if act.get("start_date_local")]
+    if not dated:
+        return None, np.zeros(0)
+    days = np.array([act["start_date_local"][:10] for act in dated], dtype="datetime64[D]")
+    loads = np.array([activity_load(act) for act in dated], dtype=np.float64)
+    first = days.min()
+    index = (days - first).astype(np.int64)
+    return first, np.bincount(index, weights=loads, minlength=int(index.max()) + 1)
+
+def ewma(loads, time_constant, initial=0.0):
+    """
+    Exponentially weighted load: x[t] = a * x[t-1] + (1 - a) * load[t], a = exp(-1/tc).
+    Each block is solved in closed form with a scaled cumulative sum, so a
+    decade of days takes a few dozen NumPy calls instead of a Python loop.
+    """
+    a = np.exp(-1.0 / time_constant)
+    out = np.empty(len(loads), dtype=np.float64)
+    powers = a ** np.arange(EWMA_BLOCK + 1)
+    state = initial
+    for start in range(0, len(loads), EWMA_BLOCK):
+        block = loads[start:start + EWMA_BLOCK]
+        n = len(block)
+        # x[t] = a^(t+1) * state + (1 - a) * a^t * sum_{i<=t} load[i] * a^-i
+        acc = np.cumsum(block / powers[:n])
+        out[start:start + n] = powers[1:n + 1] * state + (1 - a) * powers[:n] * acc
+        state = out[start + n - 1]
+    return out
+
+def _load_fitness():
+    try:
+        with np.load(FITNESS_FILE) as data:
+            return {key: data[key] for key in data.files}
+    except Exception:
+        return None
+
+def _save_fitness(series):
+    FITNESS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = FITNESS_FILE.with_suffix(".tmp.npz")
+    np.savez(tmp_path, **series)
+    os.replace(tmp_path, FITNESS_FILE)
+
+def update_fitness(activities, window_start=None, today=None):
+    """
+    Merge activities into the persisted daily series and update CTL/ATL/TSB.
+    Days from window_start on are replaced by the fresh loads, older days are
+    kept, and the EWMA is only recomputed from the first day whose load changed.
+    Returns the full series: dates, load, ctl, atl, tsb (one entry per day up to today).
+    """
+    today = np.datetime64(today or datetime.now().date(), "D")
+    fresh_first, fresh_loads = daily_load_array(activities)
+    window_start = np.datetime64(window_start, "D") if window_start is not None else fresh_first
+    stored = _load_fitness()
+
+    # 1. Dense load array from the earliest known day to today
+    starts = [day for day in (fresh_first, stored["dates"][0] if stored else None) if day is not None]
+    if not starts:
+        return None
+    first = min(min(starts), today)
+    loads = np.zeros(int((today - first).astype(np.int64)) + 1)
+    if stored:
+        offset = int((stored["dates"][0] - first).astype(np.int64))
+        kept = stored["load"][:max(0, len(loads) - offset)]
+        loads[offset:offset + len(kept)] = kept
+    if window_start is not None:
+        cut = max(0, int((window_start - first).astype(np.int64)))
+        loads[cut:] = 0.0
+    if fresh_first is not None:
+        offset = int((fresh_first - first).astype(np.int64))
+        fresh = fresh_loads[:max(0, len(loads) - offset)]
+        loads[offset:offset + len(fresh)] += fresh
+
+    # 2. Recompute only from the first changed day (carrying yesterday's CTL/ATL)
+    changed = 0
+    if stored and stored["dates"][0] == first:
+        common = min(len(stored["load"]), len(loads))
+        diff = np.flatnonzero(stored["load"][:common] != loads[:common])
+        changed = int(diff[0]) if len(diff) else common
+    if changed > 0:
+        ctl = np.concatenate([stored["ctl"][:changed], ewma(loads[changed:], CTL_DAYS, stored["ctl"][changed - 1])])
+        atl = np.concatenate([stored["atl"][:changed], ewma(loads[changed:], ATL_DAYS, stored["atl"][changed - 1])])
+    else:
+        ctl, atl = ewma(loads, CTL_DAYS), ewma(loads, ATL_DAYS)
+
+    series = {
+        "dates": first + np.arange(len(loads)).astype("timedelta64[D]"),
+        "load": loads, "ctl": ctl, "atl": atl, "tsb": ctl - atl,
+    }
+    if changed < len(loads) or not stored:
+        _save_fitness(series)
+    return series
+
+def fitness_series(since=None, until=None):
+    """
+    Full persisted CTL/ATL/TSB series (NumPy arrays), optionally sliced to
+    [since, until]. A binary search per bound, so multi-year trends are cheap.
+    """
+    series = _load_fitness()
+    if not series:
+        return None
+    dates = series["dates"]
+    lo = np.searchsorted(dates, np.datetime64(since, "D")) if since else 0
+    hi = np.searchsorted(dates, np.datetime64(until, "D"), side="right") if until else len(dates)
+    return {key: values[lo:hi] for key, values in series.items()}
+
+def training_status(tsb):
+    status = "Balanced"
+    if tsb < -20: status = "High Fatigue"
+    elif tsb > 20: status = "Fresh"
+    return status
+
+def last_known_metrics():
+    """
+    Status from the persisted series alone (no Strava, no store): the
+    fallback when a fresh calculate_metrics() takes too long.
+    """
+    series = fitness_series()
+    if not series or not len(series["dates"]):
+        return "Endurain: Metrics currently unavailable."
+    ctl, atl, tsb = series["ctl"][-1], series["atl"][-1], series["tsb"][-1]
+    return (
+        f"Endurain Status (as of {series['dates'][-1]}, not synced): {training_status(tsb)} (TSB {tsb:.1f})\n"
+        f"Fitness (CTL): {ctl:.1f} | Fatigue (ATL): {atl:.1f}"
+    )
 
 def format_pace(speed_mps):
     """Converts m/s to min/km"""
@@ -55,39 +213,53 @@ def format_pace(speed_mps):
     secs = int(sec_per_km % 60)
     return f"{mins}:{secs:02d}/km"
 
-def calculate_metrics():
+async def calculate_metrics():
     """
-    Main entry point used by beat.py and mattermost_raw.py
+    Main entry point used by beat.py and mattermost_raw.py (via skills/registry.py)
     """
-    activities = get_activities_smart()
-    
-    if not activities:
+    # One sync/update at a time across gateway workers and processes; later
+    # callers then find the store synced and only read it
+    async with locked_async(FITNESS_FILE):
+        conn = open_store()
+        try:
+            changed_since = await sync_activities(conn)
+            if STREAMS_ENABLED:
+                streams_since = await sync_streams(conn)
+                changed_since = min(filter(None, [changed_since, streams_since]), default=None)
+            return _calculate_metrics(conn, changed_since)
+        finally:
+            conn.close()
+
+def _calculate_metrics(conn, changed_since):
+    """Status report from the synced store (see calculate_metrics)."""
+    if count_activities(conn) == 0:
         return "Endurain: No training data available via Strava."
 
     today = datetime.now().date()
-    daily_load = {} 
-    valid_activities_count = 0
-    
+    today_str = today.isoformat()
+
+    # Only the rows that are needed: today's, and the days whose loads changed
+    activities = activities_between(conn, today_str, today_str)
+    rebuild = not FITNESS_FILE.exists()  # First run: build the series from the whole store
+    changed = activities_between(conn, None if rebuild else changed_since) if rebuild or changed_since else []
+
     # Store today's specific stats
     todays_report = []
 
     for act in activities:
         try:
-            act_date = datetime.strptime(act["start_date_local"], "%Y-%m-%dT%H:%M:%SZ").date()
-            days_ago = (today - act_date).days
-            
             # --- 1. Capture Today's Details ---
-            if days_ago == 0:
+            if act["start_date_local"][:10] == today_str:
                 name = act.get("name", "Activity")
-                dist_km = act.get("distance", 0) / 1000
-                moving_min = act.get("moving_time", 0) / 60
+                dist_km = (act.get("distance") or 0) / 1000
+                moving_min = (act.get("moving_time") or 0) / 60
                 
                 # Heart Rate
-                avg_hr = act.get("average_heartrate", "N/A")
-                max_hr = act.get("max_heartrate", "N/A")
+                avg_hr = act.get("average_heartrate") or "N/A"
+                max_hr = act.get("max_heartrate") or "N/A"
                 
                 # Pace/Speed
-                avg_speed = act.get("average_speed", 0)
+                avg_speed = act.get("average_speed") or 0
                 pace = format_pace(avg_speed)
                 
                 details = (
@@ -95,27 +267,17 @@ def calculate_metrics():
                     f"| HR: {avg_hr}/{max_hr} (Avg/Max) | Pace: {pace}"
                 )
                 todays_report.append(details)
-
-            # --- 2. Load Calculation for Fatigue ---
-            if days_ago < 0: continue 
-            
-            minutes = act.get("moving_time", 0) / 60
-            load = minutes * 1.0 
-            
-            daily_load[days_ago] = daily_load.get(days_ago, 0) + load
-            valid_activities_count += 1
         except:
             continue
 
-    # --- 3. Calculate CTL/ATL ---
-    atl = sum(daily_load.get(d, 0) for d in range(7)) / 7.0
-    ctl = sum(daily_load.get(d, 0) for d in range(42)) / 42.0
-    tsb = ctl - atl
+    # --- 2. CTL/ATL as exponentially weighted series over the whole history ---
+    series = update_fitness(changed, window_start=None if rebuild else changed_since, today=today)
+    if series is None:
+        return "Endurain: No training data available via Strava."
+    ctl, atl, tsb = series["ctl"][-1], series["atl"][-1], series["tsb"][-1]
 
-    # --- 4. Insight ---
-    status = "Balanced"
-    if tsb < -20: status = "High Fatigue"
-    elif tsb > 20: status = "Fresh"
+    # --- 3. Insight ---
+    status = training_status(tsb)
 
     # Format the 'Today' section
     today_section = "\n".join(todays_report) if todays_report else "   - No activities logged today."
@@ -127,4 +289,4 @@ def calculate_metrics():
     )
 
 if __name__ == "__main__":
-    print(calculate_metrics())
\ No newline at end of file
+    print(run_async(calculate_metrics()))
\ No newline at end of file
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import asyncio
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Union
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from skills.weather import get_current_weather, pending_refreshes
+from skills.endurain import calculate_metrics, last_known_metrics
+
+# --- Context Sources ---
+# Everything a prompt needs besides the user's text is a ContextSource. All
+# sources of a prompt run concurrently and each gets its own deadline: a
+# source that misses it is replaced by its fallback text, so a slow API costs
+# one prompt section instead of delaying the whole reply. The late source is
+# not cancelled; it finishes in the background (filling caches and the
+# activity store for the next prompt).
+
+# Seconds per source; override with CONTEXT_DEADLINE_<NAME>, e.g. CONTEXT_DEADLINE_ENDURAIN=10
+DEFAULT_DEADLINES = {
+    "weather": 3.0,
+    "endurain": 6.0,
+    "memory": 4.0,
+}
+
+_background = set()  # Sources still running after their deadline
+
+
+@dataclass
+class ContextSource:
+    name: str
+    fetch: Callable                  # Coroutine function, or blocking function (run on a thread), returning text
+    fallback: Union[str, Callable]   # Text, or a fast offline function returning text
+    deadline: float = None           # Seconds; default from DEFAULT_DEADLINES / env
+
+    def __post_init__(self):
+        if self.deadline is None:
+            env = os.getenv(f"CONTEXT_DEADLINE_{self.name.upper()}")
+            self.deadline = float(env) if env else DEFAULT_DEADLINES.get(self.name, 5.0)
+
+    def fallback_text(self):
+        if callable(self.fallback):
+            try:
+                return self.fallback()
+            except Exception as e:
+                return f"{self.name}: unavailable ({e})"
+        return self.fallback
+
+
+async def _run(source):
+    if asyncio.iscoroutinefunction(source.fetch):
+        return await source.fetch()
+    return await asyncio.to_thread(source.fetch)
+
+
+async def _with_deadline(source):
+    started = time.monotonic()
+    task = asyncio.ensure_future(_run(source))
+    try:
+        # shield: on timeout the source keeps running, only this prompt stops waiting
+        return await asyncio.wait_for(asyncio.shield(task), source.deadline)
+    except asyncio.TimeoutError:
+        print(f"Context: '{source.name}' missed its {source.deadline:.1f}s deadline, using fallback")
+        _background.add(task)
+        task.add_done_callback(_finish_late)
+    except Exception as e:
+        print(f"Context: '{source.name}' failed after {time.monotonic() - started:.1f}s ({e})")
+    return source.fallback_text()
+
+
+def _finish_late(task):
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Context: late source failed ({task.exception()})")
+
+
+async def gather_context(sources):
+    """{name: text} for all sources, fetched concurrently; takes as long as the slowest deadline at most."""
+    texts = await asyncio.gather(*(_with_deadline(source) for source in sources))
+    return {source.name: text for source, text in zip(sources, texts)}
+
+
+async def drain(timeout=60):
+    """
+    Let late sources finish (e.g. a Strava sync) before a short-lived process
+    ends its loop, including the weather refreshes started for stale entries.
+    """
+    pending = _background | pending_refreshes()
+    if pending:
+        await asyncio.wait(pending, timeout=timeout)
+
+
+def coach_sources(mem, query, limit):
+    """The standard coaching context: weather, Endurain metrics and memory hits for `query`."""
+    def search_memory():
+        hits = mem.search(query, limit=limit)
+        return "\n".join([f"- {h['snippet']}" for h in hits])
+
+    return [
+        ContextSource("weather", get_current_weather, "Weather: currently unavailable."),
+        ContextSource("endurain", calculate_metrics, last_known_metrics),
+        # Query embedding + matrix scoring is CPU work: a plain function, run on a thread
+        ContextSource("memory", search_memory, "(Memory search unavailable right now.)"),
+    ]
@@ -0,0 +1,71 @@
+import os
+import json
+import asyncio
+import fcntl
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager, asynccontextmanager
+
+# Small JSON state files shared by all modes (chat, heartbeat, gateway):
+# readers never see a half-written file (write to a temp file + rename) and
+# read-modify-write cycles are serialized across processes with flock.
+
+
+def read_json(path, default=None):
+    """Parsed JSON from path, or default if it is missing or unreadable."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return default
+
+
+def write_json_atomic(path, data, mode=0o600):
+    """Replace path with data in one rename; the file is created with `mode`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def locked(path, shared=False, blocking=True):
+    """
+    Exclusive (or shared) advisory lock on <path>.lock for the duration of the block.
+    With blocking=False, raises BlockingIOError if another process holds it.
+    """
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        fcntl.flock(lock_file, flags if blocking else flags | fcntl.LOCK_NB)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@asynccontextmanager
+async def locked_async(path, poll=0.05):
+    """Exclusive lock like locked(), but waits with asyncio.sleep instead of blocking the event loop."""
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(poll)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
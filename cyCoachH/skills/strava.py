@@ -1,70 +1,311 @@
 import os
-import requests
+import sys
 import time
+import asyncio
+import hashlib
+import random
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
 
 # --- Path Setup ---
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
 load_dotenv(PROJECT_ROOT / ".env")
 
+from skills.state import read_json, write_json_atomic, locked_async
+from skills.async_http import get_session, request_timeout, run_async, HTTP_ERRORS
+
 # Configuration
 CLIENT_ID = os.getenv("STRAVA_CLIENT_ID")
 CLIENT_SECRET = os.getenv("STRAVA_CLIENT_SECRET")
 REFRESH_TOKEN = os.getenv("STRAVA_REFRESH_TOKEN")
+TOKEN_FILE = PROJECT_ROOT / "memory" / "strava_token.json"  # Access token + rotated refresh token (0600)
+TOKEN_EXPIRY_MARGIN = 300  # Refresh this many seconds before expires_at
+STRAVA_BASE_URL = os.getenv("STRAVA_BASE_URL", "https://www.strava.com").rstrip("/")  # Point at a local stand-in for tests
+REQUEST_TIMEOUT = 10
+PER_PAGE = 200          # Strava's maximum page size
+FETCH_WORKERS = int(os.getenv("STRAVA_FETCH_WORKERS", 4))  # Pages requested concurrently
+MAX_RETRIES = 4         # Per page, for network errors, 429 and 5xx
 
-def get_access_token():
-    """Exchanges refresh token for a fresh access token."""
-    if not all([CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN]):
-        return None
+# --- Rate Limits ---
+# Strava budgets requests per 15 minutes (windows start at :00/:15/:30/:45)
+# and per UTC day, and reports both on every response as "short,daily" in
+# X-RateLimit-Limit / X-RateLimit-Usage (X-ReadRateLimit-* for reads).
+RATE_LIMIT_MARGIN = 5   # Requests left for other modes (heartbeat, gateway)
+RATE_LIMIT_MAX_WAIT = float(os.getenv("STRAVA_MAX_RATE_WAIT", 60))  # Longer waits end the fetch as partial
+WINDOW_SECONDS = 900
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class StravaError(Exception):
+    pass
+
+
+class RateLimiter:
+    """Shared, thread-safe view of the 15-minute and daily budgets."""
+
+    def __init__(self, short_limit=100, daily_limit=1000):
+        self.lock = threading.Lock()
+        self.limits = [short_limit, daily_limit]  # Conservative until Strava reports its own
+        self.usage = [0, 0]
+        self.window = self._window(time.time())
+        self.day = time.gmtime().tm_yday
+
+    @staticmethod
+    def _window(now):
+        return now - now % WINDOW_SECONDS
+
+    def _roll(self, now):
+        if self._window(now) != self.window:
+            self.window, self.usage[0] = self._window(now), 0
+        if time.gmtime(now).tm_yday != self.day:
+            self.day, self.usage[1] = time.gmtime(now).tm_yday, 0
+
+    def _reserve(self, max_wait):
+        """Reserve one request: 0 on success, else seconds until the next window."""
+        with self.lock:
+            now = time.time()
+            self._roll(now)
+            if self.usage[1] >= self.limits[1] - RATE_LIMIT_MARGIN:
+                raise RateLimitExceeded(f"daily budget spent ({self.usage[1]}/{self.limits[1]})")
+            if self.usage[0] < self.limits[0] - RATE_LIMIT_MARGIN:
+                self.usage[0] += 1
+                self.usage[1] += 1
+                return 0
+            return max(0.01, self._check_wait(self.window + WINDOW_SECONDS - now, max_wait))
+
+    @staticmethod
+    def _check_wait(seconds, max_wait):
+        if seconds > max_wait:
+            raise RateLimitExceeded(f"15-minute budget spent, next window in {seconds:.0f}s")
+        return max(0.0, seconds)
+
+    async def acquire(self, max_wait=RATE_LIMIT_MAX_WAIT):
+        """Reserve one request, sleeping into the next window if needed."""
+        while wait := self._reserve(max_wait):
+            await asyncio.sleep(wait)
+
+    async def wait(self, seconds, max_wait=RATE_LIMIT_MAX_WAIT):
+        await asyncio.sleep(self._check_wait(seconds, max_wait))
+
+    def update(self, headers):
+        """Adopt the limits and usage Strava reported (they include other clients' requests)."""
+        for prefix in ("X-ReadRateLimit", "X-RateLimit"):
+            limit, usage = headers.get(f"{prefix}-Limit"), headers.get(f"{prefix}-Usage")
+            if not (limit and usage):
+                continue
+            try:
+                limits = [int(v) for v in limit.split(",")[:2]]
+                usages = [int(v) for v in usage.split(",")[:2]]
+            except ValueError:
+                continue
+            with self.lock:
+                self._roll(time.time())
+                self.limits = limits
+                self.usage = [max(a, b) for a, b in zip(self.usage, usages)]
+            return
+
+    def until_next_window(self):
+        now = time.time()
+        return self._window(now) + WINDOW_SECONDS - now
+
+
+rate_limiter = RateLimiter()
+
+
+@dataclass
+class FetchResult:
+    """Activities fetched so far; complete=False means the range was cut short (see error)."""
+    activities: list = field(default_factory=list)
+    complete: bool = True
+    error: str = None
+    pages: int = 0
+
+
+def _env_fingerprint():
+    """Identifies the .env refresh token, so re-running the OAuth setup overrides the cache."""
+    return hashlib.sha256(f"{CLIENT_ID}:{REFRESH_TOKEN}".encode()).hexdigest()[:16]
+
+def _cached_token():
+    token = read_json(TOKEN_FILE, {})
+    if token.get("env") != _env_fingerprint():
+        return {}
+    return token
+
+def _is_fresh(token):
+    return bool(token.get("access_token")) and token.get("expires_at", 0) - TOKEN_EXPIRY_MARGIN > time.time()
 
-    auth_url = "https://www.strava.com/oauth/token"
-    payload = {
+def _refresh_request(token):
+    """URL and form payload of the OAuth refresh, preferring a rotated refresh token."""
+    return f"{STRAVA_BASE_URL}/oauth/token", {
         "client_id": CLIENT_ID,
         "client_secret": CLIENT_SECRET,
-        "refresh_token": REFRESH_TOKEN,
+        "refresh_token": token.get("refresh_token") or REFRESH_TOKEN,
         "grant_type": "refresh_token"
     }
-    
-    try:
-        response = requests.post(auth_url, data=payload, timeout=5)
-        if response.status_code == 200:
-            return response.json()["access_token"]
-    except:
-        pass
-    return None
-
-def get_raw_activities(days=42):
+
+def _save_token(data, refresh_token):
+    write_json_atomic(TOKEN_FILE, {
+        "access_token": data["access_token"],
+        "expires_at": data.get("expires_at", time.time() + data.get("expires_in", 0)),
+        "refresh_token": data.get("refresh_token", refresh_token),
+        "env": _env_fingerprint(),
+    })
+    return data["access_token"]
+
+async def get_access_token():
     """
-    Fetches raw activity list for the last X days (default 42 for CTL).
-    Returns list of dicts or None on error.
+    Access token shared by all modes via memory/strava_token.json; only
+    refreshed (under a file lock, so once across processes) shortly before
+    it expires. Strava may rotate the refresh token; the new one is kept.
     """
-    token = get_access_token()
-    if not token:
+    if not all([CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN]):
         return None
 
-    try:
-        url = "https://www.strava.com/api/v3/athlete/activities"
-        # Timestamp for X days ago
-        after_date = int((datetime.now() - timedelta(days=days)).timestamp())
-        
-        headers = {"Authorization": f"Bearer {token}"}
-        params = {
-            "after": after_date,
-            "per_page": 100 
-        }
-        
-        response = requests.get(url, headers=headers, params=params, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-    except:
-        pass
-    return None
-
-def get_training_status():
+    token = _cached_token()
+    if _is_fresh(token):
+        return token["access_token"]
+
+    async with locked_async(TOKEN_FILE):
+        token = _cached_token()  # Another process may have refreshed meanwhile
+        if _is_fresh(token):
+            return token["access_token"]
+
+        auth_url, payload = _refresh_request(token)
+        try:
+            async with get_session().post(auth_url, data=payload, timeout=request_timeout(5)) as response:
+                if response.status != 200:
+                    print(f"Strava: token refresh failed (HTTP {response.status})")
+                    return None
+                data = await response.json(content_type=None)
+        except HTTP_ERRORS as e:
+            print(f"Strava: token refresh failed ({e!r})")
+            return None
+        return _save_token(data, payload["refresh_token"])
+
+async def invalidate_access_token():
+    """Forget the cached access token (e.g. after a 401); the refresh token is kept."""
+    async with locked_async(TOKEN_FILE):
+        token = read_json(TOKEN_FILE)
+        if token and token.get("access_token"):
+            token["access_token"], token["expires_at"] = None, 0
+            write_json_atomic(TOKEN_FILE, token)
+
+async def _get_page(url, headers, params, max_wait):
+    """One page with rate limiting, honouring 429/Retry-After and backing off on errors."""
+    error = None
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(min(30, 2 ** attempt) + random.random())
+        await rate_limiter.acquire(max_wait)
+        try:
+            async with get_session().get(url, headers=headers, params=params, timeout=request_timeout(REQUEST_TIMEOUT)) as response:
+                rate_limiter.update(response.headers)
+                if response.status == 200:
+                    return await response.json(content_type=None)
+                status, retry_after = response.status, response.headers.get("Retry-After")
+                text = await response.text()
+        except HTTP_ERRORS as e:
+            error = f"network error: {e!r}"
+            continue
+
+        if status == 429:
+            await rate_limiter.wait(float(retry_after) if retry_after else rate_limiter.until_next_window(), max_wait)
+            error = "rate limited (429)"
+            continue
+        if status >= 500:
+            error = f"HTTP {status}"
+            continue
+        if status == 401:
+            await invalidate_access_token()  # Revoked or expired early; the next call refreshes
+        raise StravaError(f"HTTP {status}: {text[:200]}")  # Not retried
+    raise StravaError(f"gave up after {MAX_RETRIES + 1} attempts: {error}")
+
+def _activities_request(token, after, before, per_page):
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"per_page": per_page}
+    if after is not None:
+        params["after"] = int(after)
+    if before is not None:
+        params["before"] = int(before)
+    return f"{STRAVA_BASE_URL}/api/v3/athlete/activities", headers, params
+
+def _add_page(result, p, batch, per_page):
+    """Append one page in order; True once the range is done (failure or last page)."""
+    if isinstance(batch, (StravaError, RateLimitExceeded)):
+        result.complete, result.error = False, f"page {p}: {batch}"
+        return True
+    result.activities.extend(batch)
+    result.pages += 1
+    return len(batch) < per_page  # Last page; later pages in this wave are empty
+
+async def fetch_activities(after=None, before=None, per_page=PER_PAGE, workers=FETCH_WORKERS, max_wait=RATE_LIMIT_MAX_WAIT):
+    """
+    All activities between the `after`/`before` epoch timestamps, paging
+    through the whole range. The first page is fetched alone (incremental
+    syncs rarely need more); further pages go out `workers` at a time, each
+    wave as one asyncio.gather. Pages are kept in order up to the first
+    failure, so a partial result is always a gap-free prefix (oldest first
+    when `after` is given).
+    """
+    token = await get_access_token()
+    if not token:
+        return FetchResult(complete=False, error="no Strava access token")
+
+    url, headers, base_params = _activities_request(token, after, before, per_page)
+    result = FetchResult()
+    page, wave, done = 1, 1, False
+    while not done:
+        pages = range(page, page + wave)
+        batches = await asyncio.gather(
+            *(_get_page(url, headers, {**base_params, "page": p}, max_wait) for p in pages),
+            return_exceptions=True
+        )
+        for p, batch in zip(pages, batches):
+            if isinstance(batch, BaseException) and not isinstance(batch, (StravaError, RateLimitExceeded)):
+                raise batch
+            if _add_page(result, p, batch, per_page):
+                done = True
+                break
+        page, wave = page + wave, max(1, workers)
+    return result
+
+async def get_activity_streams(activity_id, keys, max_wait=RATE_LIMIT_MAX_WAIT):
+    """
+    Per-second streams of one activity as {key: list}, e.g. time, heartrate,
+    velocity_smooth, altitude, cadence. Raises StravaError/RateLimitExceeded.
+    """
+    token = await get_access_token()
+    if not token:
+        raise StravaError("no Strava access token")
+    url = f"{STRAVA_BASE_URL}/api/v3/activities/{activity_id}/streams"
+    params = {"keys": ",".join(keys), "key_by_type": "true"}
+    data = await _get_page(url, {"Authorization": f"Bearer {token}"}, params, max_wait)
+    return {key: stream.get("data", []) for key, stream in data.items()}
+
+async def get_raw_activities(days=42, after=None):
+    """
+    Fetches raw activity list for the last X days (default 42 for CTL),
+    or since the `after` epoch timestamp when given.
+    Returns list of dicts (possibly partial, with a warning) or None on error.
+    """
+    after_date = int(after) if after is not None else int((datetime.now() - timedelta(days=days)).timestamp())
+    result = await fetch_activities(after=after_date)
+    if not result.complete:
+        print(f"Strava: fetch incomplete after {len(result.activities)} activities ({result.error})")
+        if not result.activities:
+            return None
+    return result.activities
+
+async def get_training_status():
     """Text summary for simple chat contexts."""
-    activities = get_raw_activities(days=7)
+    activities = await get_raw_activities(days=7)
     if activities is None:
         return "Strava: Connection Error."
     if not activities:
@@ -72,10 +313,10 @@ def get_training_status():
 
     total_km = sum(a.get("distance", 0) for a in activities) / 1000
     count = len(activities)
-    latest = activities[0]
+    latest = max(activities, key=lambda a: a["start_date"])  # Ascending order when `after` is set
     latest_date = datetime.strptime(latest["start_date_local"], "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d")
     
     return f"Last 7 Days: {total_km:.1f}km ({count} runs). Latest: {latest_date} ({latest.get('name')})."
 
 if __name__ == "__main__":
-    print(get_training_status())
\ No newline at end of file
+    print(run_async(get_training_status()))
\ No newline at end of file
@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import numpy as np
+from pathlib import Path
+
+# --- Path Setup ---
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from skills.strava import get_activity_streams, StravaError, RateLimitExceeded
+from skills.async_http import run_async
+from skills.state import locked
+from skills.activities import open_store, get_state, set_state, save_metrics, activities_without_metrics
+
+# --- Configuration ---
+STREAMS_ENABLED = os.getenv("STRAVA_STREAMS", "off") == "on"  # Optional: costs one API call per activity
+STREAMS_PATH = PROJECT_ROOT / "memory" / "streams"
+STREAMS_PER_SYNC = int(os.getenv("STRAVA_STREAMS_PER_SYNC", 10))
+STREAM_SYNC_INTERVAL = int(os.getenv("ACTIVITY_SYNC_INTERVAL", 1800))
+
+# Compact on-disk dtypes: ~10 bytes per sample before compression
+STREAM_DTYPES = {
+    "time": np.uint32,             # Seconds since start
+    "heartrate": np.uint8,         # bpm
+    "velocity_smooth": np.float16, # m/s
+    "altitude": np.float32,        # m
+    "cadence": np.uint8,           # rpm / steps per minute per leg
+}
+STREAM_KEYS = list(STREAM_DTYPES)
+
+# --- Athlete Physiology ---
+HR_MAX = float(os.getenv("ATHLETE_HR_MAX", 190))
+HR_REST = float(os.getenv("ATHLETE_HR_REST", 50))
+LTHR = float(os.getenv("ATHLETE_LTHR", 170))  # Lactate threshold heart rate
+TRIMP_K = 1.92                               # Banister weighting (0.64 * e^(1.92 x))
+ZONE_EDGES = np.array([0.6, 0.7, 0.8, 0.9]) * HR_MAX  # Upper bounds of zones 1-4 (% of HR max)
+MAX_GAP = 30  # Seconds; longer gaps between samples are pauses and carry no load
+
+
+def _stream_file(activity_id):
+    return STREAMS_PATH / f"{activity_id}.npz"
+
+
+def save_streams(activity_id, streams):
+    """Store the streams of one activity as a compressed .npz (written atomically)."""
+    STREAMS_PATH.mkdir(parents=True, exist_ok=True)
+    arrays = {
+        key: np.asarray(values, dtype=np.float64).astype(STREAM_DTYPES[key])
+        for key, values in streams.items()
+        if key in STREAM_DTYPES and len(values)
+    }
+    target = _stream_file(activity_id)
+    tmp_path = target.with_suffix(".tmp.npz")
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, target)
+    return arrays
+
+
+def load_streams(activity_id):
+    """{key: array} for one activity, or None if its streams were never fetched."""
+    try:
+        with np.load(_stream_file(activity_id)) as data:
+            return {key: data[key] for key in data.files}
+    except OSError:
+        return None
+
+
+def _trimp(hr_reserve, minutes):
+    return float(np.sum(minutes * hr_reserve * 0.64 * np.exp(TRIMP_K * hr_reserve)))
+
+
+def compute_metrics(streams):
+    """
+    Vectorized load model over per-second streams:
+      trimp          Banister TRIMP (heart-rate reserve, exponentially weighted)
+      hrtss          TRIMP relative to one hour at LTHR (= 100)
+      zone_seconds   time in HR zones 1-5
+      elevation_load moving minutes weighted by the grade cost of running
+    """
+    t = streams.get("time")
+    if t is None or len(t) < 2:
+        return {"samples": 0}
+    t = t.astype(np.float64)
+    dt = np.diff(t, prepend=t[0])
+    dt[dt > MAX_GAP] = 0.0
+    metrics = {"samples": int(len(t))}
+
+    hr = streams.get("heartrate")
+    if hr is not None and len(hr) == len(t):
+        hr = hr.astype(np.float64)
+        reserve = np.clip((hr - HR_REST) / (HR_MAX - HR_REST), 0.0, 1.0)
+        metrics["trimp"] = _trimp(reserve, dt / 60)
+        lthr_reserve = (LTHR - HR_REST) / (HR_MAX - HR_REST)
+        metrics["hrtss"] = 100 * metrics["trimp"] / _trimp(np.array([lthr_reserve]), np.array([60.0]))
+        zones = np.bincount(np.digitize(hr, ZONE_EDGES), weights=dt, minlength=5)
+        metrics["zone_seconds"] = [round(float(s)) for s in zones]
+
+    velocity, altitude = streams.get("velocity_smooth"), streams.get("altitude")
+    if velocity is not None and altitude is not None and len(velocity) == len(altitude) == len(t):
+        distance = velocity.astype(np.float64) * dt
+        climb = np.diff(altitude.astype(np.float64), prepend=float(altitude[0]))
+        grade = np.divide(climb, distance, out=np.zeros_like(distance), where=distance > 1.0)
+        grade = np.clip(grade * 100, -40, 40)  # percent
+        # ~3.3% more effort per % uphill, ~1.8% less per % downhill (floored)
+        cost = np.where(grade > 0, 1 + 0.033 * grade, np.maximum(0.8, 1 + 0.018 * grade))
+        moving = velocity.astype(np.float64) > 0.5
+        metrics["elevation_load"] = float(np.sum(dt[moving] / 60 * cost[moving]))
+    return metrics
+
+
+def _process_streams(activity_id, streams):
+    return compute_metrics(save_streams(activity_id, streams) if streams else {})
+
+
+async def sync_streams(conn, limit=STREAMS_PER_SYNC, force=False):
+    """
+    Fetch and process the streams of up to `limit` activities without
+    metrics (newest first). Returns the earliest local date whose load
+    changed, or None. Compressing and scoring the streams runs on a thread.
+    """
+    now = time.time()
+    if not force and now - (get_state(conn, "last_stream_sync") or 0) < STREAM_SYNC_INTERVAL:
+        return None
+
+    earliest = None
+    pending = activities_without_metrics(conn, limit)
+    for act in pending:
+        try:
+            streams = await get_activity_streams(act["id"], STREAM_KEYS)
+        except RateLimitExceeded as e:
+            print(f"Streams: stopping, {e}")
+            break
+        except StravaError as e:
+            if "HTTP 404" not in str(e):
+                print(f"Streams: activity {act['id']} failed ({e})")
+                continue
+            streams = {}  # Manual entry: nothing to fetch, don't retry
+        metrics = await asyncio.to_thread(_process_streams, act["id"], streams)
+        with conn:
+            save_metrics(conn, act["id"], metrics)
+        day = act["start_date_local"][:10]
+        earliest = day if earliest is None else min(earliest, day)
+    else:
+        with conn:
+            set_state(conn, "last_stream_sync", now)
+    return earliest
+
+
+def recompute_all(conn):
+    """Re-run compute_metrics over every stored stream (after changing HR settings)."""
+    cursor = conn.execute("SELECT id FROM activity_metrics WHERE samples > 0")
+    ids = [row[0] for row in cursor.fetchall()]
+    with conn:
+        for activity_id in ids:
+            streams = load_streams(activity_id)
+            if streams is not None:
+                save_metrics(conn, activity_id, compute_metrics(streams))
+    return len(ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill Strava streams and load metrics")
+    parser.add_argument("--limit", type=int, default=200, help="Activities to fetch in this run")
+    parser.add_argument("--recompute", action="store_true", help="Recompute metrics from stored streams")
+    args = parser.parse_args()
+
+    from skills.endurain import FITNESS_FILE
+
+    conn = open_store()
+    if args.recompute:
+        print(f"Recomputed {recompute_all(conn)} activities.")
+        changed = True
+    else:
+        changed = run_async(sync_streams(conn, args.limit, force=True))
+        print(f"Processed streams back to: {changed or 'nothing new'}")
+    conn.close()
+    if changed:
+        # Same lock as calculate_metrics(), so a running update never writes the stale series back
+        with locked(FITNESS_FILE):
+            FITNESS_FILE.unlink(missing_ok=True)  # Rebuilt from the store on the next calculate_metrics()
@@ -1,78 +1,226 @@
 import os
-import requests
+import sys
+import time
+import asyncio
+from datetime import datetime
 from dotenv import load_dotenv
 from pathlib import Path
 
 # --- Path Setup ---
 # skills/weather.py -> parent (skills) -> parent (root)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
 load_dotenv(PROJECT_ROOT / ".env")
 
+from skills.state import read_json, write_json_atomic, locked
+from skills.async_http import get_session, request_timeout, run_async, HTTP_ERRORS
+
 # Configuration
 # We use the key from .env to keep it secure, but it will use the one you tested.
 API_KEY = os.getenv("OPENWEATHER")
+BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org").rstrip("/")
 
 # Chur Coordinates
 LAT = "46.8508"
 LON = "9.5320"
 
-def get_current_weather():
+# --- Cache ---
+# Shared by every mode through one JSON file. Fresh entries are returned
+# as-is; stale ones are returned immediately while a background task
+# refreshes them; if the API is down the last good value is kept.
+CACHE_FILE = PROJECT_ROOT / "memory" / "weather_cache.json"
+WEATHER_TTL = int(os.getenv("WEATHER_TTL", 600))             # Current weather, seconds
+FORECAST_TTL = int(os.getenv("WEATHER_FORECAST_TTL", 10800))  # Forecast, seconds
+RETRY_AFTER_ERROR = 120  # Don't retry a failing API more often than this
+STALE_NOTE_AFTER = 3600  # Mention the age of values older than this
+
+_refreshing = set()
+_tasks = set()  # Background refresh tasks (keeps them referenced until done)
+
+
+class WeatherError(Exception):
+    pass
+
+
+def _params():
+    return {"lat": LAT, "lon": LON, "appid": API_KEY, "units": "metric"}
+
+
+def _check_status(status):
+    if status == 401:
+        raise WeatherError("Weather Error: Invalid API Token. Check .env")
+    if status != 200:
+        raise WeatherError(f"Weather Error: HTTP {status}")
+
+
+async def _fetch(endpoint):
+    """One OpenWeather 2.5 call (weather or forecast) on the shared aiohttp session; raises WeatherError."""
+    try:
+        # 5-second timeout to prevent hanging the bot
+        async with get_session().get(f"{BASE_URL}/data/2.5/{endpoint}", params=_params(), timeout=request_timeout(5)) as response:
+            _check_status(response.status)
+            return await response.json(content_type=None)
+    except HTTP_ERRORS as e:
+        raise WeatherError(f"Weather Check Failed: {str(e)[:50] or type(e).__name__}")
+
+
+def _refresh_due(endpoint, ttl):
+    """(cache, entry) if the entry needs fetching, else (None, entry). Call under the cache lock."""
+    cache = read_json(CACHE_FILE, {})
+    entry = cache.get(endpoint, {})
+    now = time.time()
+    if now - entry.get("fetched_at", 0) < ttl:
+        return None, entry  # Another process refreshed it meanwhile
+    if now - entry.get("failed_at", 0) < RETRY_AFTER_ERROR:
+        return None, entry  # Also without any data yet: an outage costs one request per interval
+    return cache, entry
+
+
+def _store(cache, endpoint, entry, data=None, error=None):
+    """Save a fetch result; on errors the last good data is kept."""
+    now = time.time()
+    if error is None:
+        entry = {"data": data, "fetched_at": now}
+    else:
+        entry = {**entry, "error": str(error), "failed_at": now}
+    cache[endpoint] = entry
+    write_json_atomic(CACHE_FILE, cache, mode=0o644)
+    return entry
+
+
+async def _refresh(endpoint, ttl):
+    """
+    Fetch and store one endpoint under the cache lock; keeps the old value on
+    errors. Never waits for the lock: returns None if another process holds it.
+    """
+    try:
+        with locked(CACHE_FILE, blocking=False):
+            cache, entry = _refresh_due(endpoint, ttl)
+            if cache is None:
+                return entry
+            try:
+                return _store(cache, endpoint, entry, data=await _fetch(endpoint))
+            except WeatherError as e:
+                return _store(cache, endpoint, entry, error=e)
+    except BlockingIOError:
+        return None  # Someone else is refreshing
+    finally:
+        _refreshing.discard(endpoint)
+
+
+def _refresh_in_background(endpoint, ttl):
+    if endpoint in _refreshing:
+        return
+    _refreshing.add(endpoint)
+    task = asyncio.get_running_loop().create_task(_refresh(endpoint, ttl))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def pending_refreshes():
+    """Background refreshes still running (see skills.registry.drain)."""
+    return set(_tasks)
+
+
+async def get_cached(endpoint, ttl):
+    """
+    Cache entry for an endpoint: {"data", "fetched_at"} plus "error" if the
+    last refresh failed. Only the very first fetch is awaited; later
+    refreshes run as tasks on the running loop. Without data, a failed
+    fetch is not retried for RETRY_AFTER_ERROR (the error entry is returned).
+    """
+    entry = read_json(CACHE_FILE, {}).get(endpoint)
+    deadline = time.monotonic() + 6  # A concurrent first fetch times out after 5s
+    while not entry or "data" not in entry:
+        _refreshing.add(endpoint)
+        entry = await _refresh(endpoint, ttl)
+        if entry is not None or time.monotonic() > deadline:
+            return entry or {}
+        await asyncio.sleep(0.1)  # Another process is fetching it
+        entry = read_json(CACHE_FILE, {}).get(endpoint)
+    if time.time() - entry.get("fetched_at", 0) >= ttl:
+        _refresh_in_background(endpoint, ttl)
+    return entry
+
+
+def _age_note(entry):
+    age = time.time() - entry.get("fetched_at", 0)
+    if age < STALE_NOTE_AFTER:
+        return ""
+    return f" (Stand {datetime.fromtimestamp(entry['fetched_at']).strftime('%d.%m. %H:%M')})"
+
+
+async def get_current_weather():
     """
-    Fetches weather via OpenWeather API 2.5 (Current Weather).
+    Current weather in Chur via OpenWeather API 2.5, served from the shared cache.
     """
     if not API_KEY:
         return "Weather Error: 'OPENWEATHER' key missing in .env"
+    return _format_current(await get_cached("weather", WEATHER_TTL))
+
+
+def _format_current(entry):
+    if "data" not in entry:
+        return entry.get("error", "Weather Check Failed: no data")
+    data = entry["data"]
+
+    # Parse 2.5 Response Structure
+    # ----------------------------
+    # {
+    #   "weather": [{"description": "clear sky", ...}],
+    #   "main": {"temp": 12.5, "feels_like": 11.2, "humidity": 50},
+    #   "wind": {"speed": 1.5},
+    #   ...
+    # }
+
+    main = data.get("main", {})
+    weather_list = data.get("weather", [{}])[0]
+    wind = data.get("wind", {})
+
+    temp = main.get("temp", 0)
+    feels_like = main.get("feels_like", 0)
+    humidity = main.get("humidity", 0)
+    desc = weather_list.get("description", "Unknown")
+    wind_speed = wind.get("speed", 0)
+
+    # Format the report for the LLM
+    report = (
+        f"Chur: {desc.capitalize()}, "
+        f"{temp:.1f}°C (Feels {feels_like:.1f}°C), "
+        f"Humidity {humidity}%, Wind {wind_speed}m/s."
+    )
+
+    return report + _age_note(entry)
+
+
+async def get_forecast(hours=24):
+    """Compact forecast for the next hours (3-hour steps), served from the shared cache."""
+    if not API_KEY:
+        return "Weather Error: 'OPENWEATHER' key missing in .env"
+    return _format_forecast(await get_cached("forecast", FORECAST_TTL), hours)
+
+
+def _format_forecast(entry, hours):
+    if "data" not in entry:
+        return entry.get("error", "Forecast Check Failed: no data")
+
+    now = time.time()
+    slots = [slot for slot in entry["data"].get("list", []) if now - 10800 < slot.get("dt", 0) <= now + hours * 3600]
+    if not slots:
+        return "Forecast: no data for the coming hours."
+
+    lines = []
+    for slot in slots:
+        when = datetime.fromtimestamp(slot["dt"]).strftime("%a %H:%M")
+        desc = slot.get("weather", [{}])[0].get("description", "Unknown")
+        rain = slot.get("pop", 0) * 100
+        lines.append(f"{when}: {slot.get('main', {}).get('temp', 0):.0f}°C, {desc}, Regen {rain:.0f}%")
+    return "Chur Forecast:\n" + "\n".join(lines) + _age_note(entry)
+
+
+async def _main():
+    return "\n".join([await get_current_weather(), await get_forecast()])
 
-    try:
-        # Standard 2.5 Endpoint (Current Weather)
-        url = "https://api.openweathermap.org/data/2.5/weather"
-        params = {
-            "lat": LAT,
-            "lon": LON,
-            "appid": API_KEY,
-            "units": "metric"
-        }
-        
-        # 5-second timeout to prevent hanging the bot
-        response = requests.get(url, params=params, timeout=5)
-        
-        if response.status_code == 401:
-            return "Weather Error: Invalid API Token. Check .env"
-        elif response.status_code != 200:
-            return f"Weather Error: HTTP {response.status_code}"
-
-        data = response.json()
-        
-        # Parse 2.5 Response Structure
-        # ----------------------------
-        # {
-        #   "weather": [{"description": "clear sky", ...}], 
-        #   "main": {"temp": 12.5, "feels_like": 11.2, "humidity": 50}, 
-        #   "wind": {"speed": 1.5}, 
-        #   ...
-        # }
-        
-        main = data.get("main", {})
-        weather_list = data.get("weather", [{}])[0]
-        wind = data.get("wind", {})
-        
-        temp = main.get("temp", 0)
-        feels_like = main.get("feels_like", 0)
-        humidity = main.get("humidity", 0)
-        desc = weather_list.get("description", "Unknown")
-        wind_speed = wind.get("speed", 0)
-        
-        # Format the report for the LLM
-        report = (
-            f"Chur: {desc.capitalize()}, "
-            f"{temp:.1f}°C (Feels {feels_like:.1f}°C), "
-            f"Humidity {humidity}%, Wind {wind_speed}m/s."
-        )
-        
-        return report
-
-    except Exception as e:
-        return f"Weather Check Failed: {str(e)[:50]}"
 
 if __name__ == "__main__":
-    print(get_current_weather())
\ No newline at end of file
+    print(run_async(_main()))
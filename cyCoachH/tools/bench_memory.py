@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import resource
+import numpy as np
+from datetime import date, timedelta
+from pathlib import Path
+
+# -------------------------------------------------------
+# Memory subsystem benchmark.
+# Generates a synthetic German vault in a temp directory, runs the real
+# MemorySystem against it and prints machine-readable JSON:
+#
+#   python tools/bench_memory.py --days 10000 --output bench.json
+#   python tools/bench_memory.py --days 10000 --compare bench.json
+# -------------------------------------------------------
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+os.environ.setdefault("MEMORY_DAEMON", "off")  # Always measure in-process
+
+# --- Synthetic vault ---
+SPORTS = ["Laufen", "Schwimmen", "Radfahren", "Krafttraining", "Mobility", "Barfusslaufen", "Intervalle"]
+FEELINGS = ["müde", "frisch", "motiviert", "verspannt", "erholt", "erschöpft", "konzentriert"]
+TOPICS = ["Pulszonen", "Regeneration", "Ernährung", "Schlaf", "Wettkampfplanung", "Technik", "Verletzungsprävention"]
+PLACES = ["Chur", "am Rhein", "im Hallenbad", "auf dem Rollentrainer", "in den Bergen", "auf der Bahn"]
+QUESTIONS = [
+    "Wie sollte ich nach {sport} heute regenerieren?",
+    "Ist {sport} bei {feeling}em Gefühl sinnvoll?",
+    "Was sagt mein Plan zu {topic} diese Woche?",
+    "Wie viel {sport} brauche ich für den Ironman 2029?",
+    "Kannst du mir Tipps zu {topic} geben?",
+]
+ANSWERS = [
+    "Heute {sport} {place}, locker in Zone 2. Achte auf {topic} und höre auf deinen Körper.",
+    "Du fühlst dich {feeling}. Reduziere die Intensität und plane morgen {sport} ein.",
+    "Für {topic} gilt: Konstanz schlägt Intensität. {sport} {place} ist eine gute Wahl.",
+    "Dein Fokus liegt auf {topic}. Nach dem {sport} 10 Minuten Mobility und ausreichend Schlaf.",
+]
+
+
+def _fill(rng, template):
+    return template.format(
+        sport=rng.choice(SPORTS), feeling=rng.choice(FEELINGS),
+        topic=rng.choice(TOPICS), place=rng.choice(PLACES)
+    )
+
+
+def make_daily_log(rng, day, entries):
+    lines = [f"# Tageslog {day.isoformat()}", ""]
+    for i in range(entries):
+        hour, minute = 6 + i * 2 % 16, rng.randrange(60)
+        lines += [
+            f"### Chat [{hour:02d}:{minute:02d}]",
+            f"**User:** {_fill(rng, rng.choice(QUESTIONS))}",
+            "",
+            "**cyCoachH:**",
+            " ".join(_fill(rng, rng.choice(ANSWERS)) for _ in range(rng.randint(1, 4))),
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def generate_vault(vault_path, days, seed):
+    rng = random.Random(seed)
+    daily = vault_path / "daily"
+    daily.mkdir(parents=True, exist_ok=True)
+    start = date.today() - timedelta(days=days - 1)  # Newest log is today (hot vs. cold months)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        (daily / f"{day.isoformat()}.md").write_text(make_daily_log(rng, day, rng.randint(1, 6)), encoding="utf-8")
+
+    # Core documents: copy the real ones when available
+    for name in ["SYSTEM.md", "SOUL.md", "USER.md", "MEMORY.md"]:
+        source = PROJECT_ROOT / "memory" / "vault" / name
+        text = source.read_text(encoding="utf-8") if source.exists() else make_daily_log(rng, start, 20)
+        (vault_path / name).write_text(text, encoding="utf-8")
+    return sorted(daily.glob("*.md"))
+
+
+# --- Measurement helpers ---
+def rss_mb():
+    """Current resident set size (Linux), falling back to peak RSS."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except Exception:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(samples_s):
+    ms = np.asarray(samples_s) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)),
+            "mean_ms": float(ms.mean()), "n": len(ms)}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def db_size_mb(db_path):
+    total = sum(Path(f"{db_path}{suffix}").stat().st_size
+                for suffix in ["", "-wal", "-shm"] if Path(f"{db_path}{suffix}").exists())
+    return total / 2**20
+
+
+def make_queries(rng, n):
+    return [_fill(rng, rng.choice(QUESTIONS + ANSWERS)) for _ in range(n)]
+
+
+# --- Benchmark ---
+def run(args):
+    workdir = Path(tempfile.mkdtemp(prefix="cycoach-bench-"))
+    os.chdir(workdir)  # MemorySystem paths are relative: memory/db.sqlite, memory/vault
+    from memory import ingest
+    from memory.ingest import MemorySystem
+
+    report = {
+        "config": {"days": args.days, "queries": args.queries, "seed": args.seed,
+                   "modify_fraction": args.modify_fraction, "batch_size": args.batch_size,
+                   "parallel": args.parallel, "model": ingest.MODEL_NAME},
+        "env": {"python": platform.python_version(), "machine": platform.machine(),
+                "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+    }
+    rng = random.Random(args.seed)
+
+    t, daily_files = timed(generate_vault, Path("memory/vault"), args.days, args.seed)
+    report["vault"] = {"files": len(daily_files) + 4, "generate_s": t}
+
+    # 1. Cold ingest (includes model load)
+    rss_before = rss_mb()
+    mem = MemorySystem(use_daemon=False)
+    t, _ = timed(mem.ingest_vault, batch_size=args.batch_size, parallel=args.parallel)
+    chunks = mem.conn.execute("SELECT count(*) FROM documents").fetchone()[0]
+    report["ingest_cold"] = {"seconds": t, "docs_per_s": report["vault"]["files"] / t,
+                             "chunks": chunks, "chunks_per_s": chunks / t}
+
+    # 2. No-op rescan and incremental ingest (append a chat entry to some logs)
+    t, _ = timed(mem.ingest_vault)
+    report["ingest_noop"] = {"seconds": t}
+
+    touched = rng.sample(daily_files, max(1, int(len(daily_files) * args.modify_fraction)))
+    for path in touched:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n" + make_daily_log(rng, date.today(), 1).split("\n", 2)[2])
+    t, _ = timed(mem.ingest_vault, batch_size=args.batch_size, parallel=args.parallel)
+    report["ingest_incremental"] = {"seconds": t, "files": len(touched), "files_per_s": len(touched) / t}
+
+    # 3. Search latency (cold = query embedding computed, warm = query cache hit)
+    queries = make_queries(rng, args.queries)
+    for mode in ["exact", "ann"]:
+        cold = [timed(mem.search, q, 5, mode=mode, archive=False)[0] for q in queries] if mode == "exact" else None
+        warm = [timed(mem.search, q, 5, mode=mode, archive=False)[0] for q in queries]
+        report[f"search_{mode}"] = {"warm_cache": percentiles(warm), "ann_index": mem.ann is not None}
+        if cold:
+            report[f"search_{mode}"]["cold_cache"] = percentiles(cold)
+
+    # Archive search also scans the memory-mapped cold months
+    archive = [timed(mem.search, q, 5, archive=True)[0] for q in queries]
+    report["search_archive"] = {"warm_cache": percentiles(archive), "hot_rows": len(mem.matrix_ids)}
+
+    # 4. Keyword index (FTS5 bm25, replaces the old in-memory BM25 rebuild)
+    keyword = [timed(mem._keyword_scores, q)[0] for q in queries]
+    t_rebuild, _ = timed(mem.conn.execute, "INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+    mem.conn.commit()
+    report["keyword_index"] = {"query": percentiles(keyword), "full_rebuild_s": t_rebuild}
+
+    # 5. Startup: a fresh process-equivalent loading matrix + ANN index
+    t, fresh = timed(MemorySystem, use_daemon=False)
+    report["startup"] = {"seconds": t, "matrix_rows": len(fresh.matrix_ids)}
+
+    report["resources"] = {
+        "rss_mb": rss_mb(), "rss_delta_mb": rss_mb() - rss_before,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "db_size_mb": db_size_mb(ingest.DB_PATH),
+    }
+    report["workdir"] = str(workdir) if args.keep else None
+    if not args.keep:
+        import shutil
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def _flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(report, baseline):
+    """Print metric deltas vs. a previous run (negative % = faster/smaller)."""
+    current, previous = _flatten(report), _flatten(baseline)
+    print(f"{'metric':45} {'baseline':>12} {'current':>12} {'change':>9}", file=sys.stderr)
+    for name in sorted(current.keys() & previous.keys()):
+        if name.startswith(("config.", "env.")):
+            continue
+        old, new = previous[name], current[name]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{name:45} {old:12.3f} {new:12.3f} {change:>9}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark memory/ingest.py on a synthetic vault")
+    parser.add_argument("--days", type=int, default=2000, help="Number of synthetic daily logs")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--modify-fraction", type=float, default=0.01, help="Share of logs appended to before the incremental ingest")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--parallel", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Write JSON here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary vault and database")
+    args = parser.parse_args()
+    # run() changes into a temp directory; resolve user paths first
+    args.output = args.output.resolve() if args.output else None
+    args.compare = args.compare.resolve() if args.compare else None
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))